@@ -1,9 +1,10 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { motion } from "framer-motion";
 import Link from "next/link";
-import { apiRequest } from "@/lib/api";
+import { apiRequest, withCursor } from "@/lib/api";
+import type { Page } from "@/lib/api";
 import { formatMoney } from "@/lib/currency";
 import { Search, MoreHorizontal, Check, Bike, Clock, RotateCcw } from "lucide-react";
 import OrderActionModal from "@/components/admin/OrderActionModal";
@@ -22,9 +23,23 @@ interface Order {
   customer_profile_picture?: string;
 }
 
+// Tabs filter server-side so they are not limited to the orders already loaded
+const TAB_STATUSES: Record<string, string> = {
+  Pending: "PENDING",
+  Accepted: "ACCEPTED",
+  Cleaning: "CLEANING",
+  Ready: "READY",
+  History: "DELIVERED,COMPLETED,CANCELLED",
+};
+
+const ordersEndpoint = (tab: string) =>
+  TAB_STATUSES[tab] ? `/orders/admin/all/?status=${TAB_STATUSES[tab]}` : "/orders/admin/all/";
+
 export default function AdminOrdersPage() {
   const [orders, setOrders] = useState<Order[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeTab, setActiveTab] = useState("All");
   const [searchTerm, setSearchTerm] = useState("");
 
@@ -33,21 +48,36 @@ export default function AdminOrdersPage() {
   const [selectedOrder, setSelectedOrder] = useState<Order | null>(null);
   const [modalAction, setModalAction] = useState<"ACCEPT" | "ASSIGN" | "STATUS" | null>(null);
 
-  const fetchOrders = async () => {
+  const fetchOrders = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await apiRequest("/orders/admin/all/");
-      setOrders(data);
+      const data: Page<Order> = await apiRequest(ordersEndpoint(activeTab));
+      setOrders(data.results);
+      setNextCursor(data.next);
     } catch (err) {
       console.error("Failed to fetch orders", err);
     } finally {
       setLoading(false);
     }
+  }, [activeTab]);
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data: Page<Order> = await apiRequest(withCursor(ordersEndpoint(activeTab), nextCursor));
+      setOrders((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next);
+    } catch (err) {
+      console.error("Failed to fetch more orders", err);
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
   useEffect(() => {
     fetchOrders();
-  }, []);
+  }, [fetchOrders]);
 
   const openModal = (order: Order, action: "ACCEPT" | "ASSIGN" | "STATUS") => {
     setSelectedOrder(order);
@@ -55,16 +85,11 @@ export default function AdminOrdersPage() {
     setIsModalOpen(true);
   };
 
-  const filteredOrders = orders.filter((order) => {
-    const matchesSearch =
+  const filteredOrders = orders.filter(
+    (order) =>
       order.order_id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      order.customer_name.toLowerCase().includes(searchTerm.toLowerCase());
-
-    if (activeTab === "All") return matchesSearch;
-    if (activeTab === "History")
-      return matchesSearch && ["DELIVERED", "COMPLETED", "CANCELLED"].includes(order.status);
-    return matchesSearch && order.status === activeTab.toUpperCase().replace(" ", "_");
-  });
+      order.customer_name.toLowerCase().includes(searchTerm.toLowerCase()),
+  );
 
   const getStatusColor = (status: string) => {
     switch (status) {
@@ -373,6 +398,14 @@ export default function AdminOrdersPage() {
         </div>
       </div>
 
+      {nextCursor && !loading && (
+        <div className="flex justify-center !mt-6">
+          <button onClick={loadMore} disabled={loadingMore} className="btn btn-ghost btn-sm">
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
+
       <OrderActionModal
         isOpen={isModalOpen}
         onClose={() => setIsModalOpen(false)}
@@ -52,10 +52,10 @@ export default function AdminDashboard() {
       try {
         const [statsData, ordersData] = await Promise.all([
           apiRequest("/orders/admin/stats/"),
-          apiRequest("/orders/admin/all/"),
+          apiRequest("/orders/admin/all/?page_size=5"),
         ]);
         setStats(statsData);
-        setRecentOrders(ordersData.slice(0, 5)); // Get top 5 recent
+        setRecentOrders(ordersData.results); // Top 5 recent
       } catch (error) {
         console.error("Failed to fetch admin data:", error);
       } finally {
@@ -4,7 +4,8 @@ import { useState, useEffect } from "react";
 import { motion } from "framer-motion";
 import { Search, UserPlus, Circle, MapPin } from "lucide-react";
 
-import { apiRequest } from "@/lib/api";
+import { apiRequest, withCursor } from "@/lib/api";
+import type { Page } from "@/lib/api";
 import UserAvatar from "@/components/ui/UserAvatar";
 
 interface Rider {
@@ -31,9 +32,14 @@ interface PendingOrder {
   assigned_rider_id?: number;
 }
 
+// Open orders without a rider; the filter runs server-side so every page is relevant
+const UNASSIGNED_ENDPOINT = "/orders/admin/all/?unassigned=true";
+
 export default function AdminRiders() {
   const [riders, setRiders] = useState<Rider[]>([]);
   const [pendingOrders, setPendingOrders] = useState<PendingOrder[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
   const [isRegistering, setIsRegistering] = useState(false);
   const [searchTerm, setSearchTerm] = useState("");
@@ -51,12 +57,9 @@ export default function AdminRiders() {
       const ridersData = await apiRequest("/logistics/admin/riders/");
       setRiders(ridersData);
 
-      // Fetch unassigned orders (orders without assigned_rider_id)
-      const ordersData: PendingOrder[] = await apiRequest("/orders/admin/all/"); // Assuming this exists or using a filter
-      const unassigned = ordersData.filter(
-        (o) => !o.assigned_rider_id && !["DELIVERED", "COMPLETED", "CANCELLED"].includes(o.status),
-      );
-      setPendingOrders(unassigned);
+      const unassigned: Page<PendingOrder> = await apiRequest(UNASSIGNED_ENDPOINT);
+      setPendingOrders(unassigned.results);
+      setNextCursor(unassigned.next);
     } catch (error) {
       console.error("Failed to fetch admin data:", error);
     } finally {
@@ -64,6 +67,22 @@ export default function AdminRiders() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data: Page<PendingOrder> = await apiRequest(
+        withCursor(UNASSIGNED_ENDPOINT, nextCursor),
+      );
+      setPendingOrders((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next);
+    } catch (error) {
+      console.error("Failed to fetch more orders:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
@@ -366,6 +385,14 @@ export default function AdminRiders() {
             </tbody>
           </table>
         </div>
+
+        {nextCursor && (
+          <div className="flex justify-center">
+            <button onClick={loadMore} disabled={loadingMore} className="btn btn-ghost btn-sm">
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </section>
     </div>
   );
@@ -2,7 +2,8 @@
 
 import { useEffect, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
-import { apiRequest } from "@/lib/api";
+import { apiRequest, withCursor } from "@/lib/api";
+import type { Page } from "@/lib/api";
 import { formatMoney } from "@/lib/currency";
 import { motion } from "framer-motion";
 import { ArrowLeft, Phone, MapPin, Mail, ShoppingBag } from "lucide-react";
@@ -30,12 +31,16 @@ interface UserOrder {
   customer_name?: string;
 }
 
+const ordersEndpoint = (userId: string | string[]) => `/orders/admin/all/?user_id=${userId}`;
+
 export default function UserDetailsPage() {
   const params = useParams();
   const router = useRouter();
   const [user, setUser] = useState<UserDetails | null>(null);
   const [orders, setOrders] = useState<UserOrder[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -47,15 +52,9 @@ export default function UserDetailsPage() {
         // Note: Reusing superadmin endpoint which likely returns needed info
         setUser(userData);
 
-        // Fetch user orders? Currently backend filter filters by logged in user.
-        // Need to update backend or filter strictly on frontend from ALL orders if no endpoint.
-        // Ideally: /orders/admin/user/<id>/
-        // For now: Fetching ALL admin orders and filtering (inefficient but works for MVP)
-        const allOrders: UserOrder[] = await apiRequest("/orders/admin/all/");
-        const userOrders = allOrders.filter(
-          (o) => o.user_id === String(params.id) || o.customer_name === userData.username,
-        );
-        setOrders(userOrders);
+        const data: Page<UserOrder> = await apiRequest(ordersEndpoint(params.id));
+        setOrders(data.results);
+        setNextCursor(data.next);
       } catch (err) {
         console.error("Failed to fetch user details", err);
       } finally {
@@ -65,6 +64,22 @@ export default function UserDetailsPage() {
     if (params.id) fetchData();
   }, [params.id]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data: Page<UserOrder> = await apiRequest(
+        withCursor(ordersEndpoint(params.id), nextCursor),
+      );
+      setOrders((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next);
+    } catch (err) {
+      console.error("Failed to fetch more orders", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) return <div className="text-white">Loading...</div>;
   if (!user) return <div className="text-white">User not found</div>;
 
@@ -156,6 +171,14 @@ export default function UserDetailsPage() {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="flex justify-center">
+            <button onClick={loadMore} disabled={loadingMore} className="btn btn-ghost btn-sm">
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,9 +1,10 @@
 "use client";
 
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useCallback } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Loader2, Star, Calendar, Package, Receipt, Phone } from "lucide-react";
-import { apiRequest } from "@/lib/api";
+import { apiRequest, withCursor } from "@/lib/api";
+import type { Page } from "@/lib/api";
 import { formatMoney } from "@/lib/currency";
 import { useAuth } from "@/context/AuthContext";
 import { useRouter } from "next/navigation";
@@ -27,11 +28,40 @@ interface Order {
   }>;
 }
 
+interface OrderSummary {
+  orders: number;
+  items: number;
+  spent: number;
+}
+
+const CATEGORIES = [
+  { id: "Pending", title: "Pending Orders", statuses: ["PENDING"] },
+  {
+    id: "Active",
+    title: "In Progress",
+    statuses: ["ACCEPTED", "PICKED_UP", "CLEANING", "READY"],
+  },
+  {
+    id: "History",
+    title: "Completed",
+    statuses: ["DELIVERED", "COMPLETED", "CANCELLED"],
+  },
+];
+
+// Tabs filter server-side so they are not limited to the orders already loaded
+const ordersEndpoint = (tab: string) => {
+  const category = CATEGORIES.find((c) => c.id === tab);
+  return category ? `/orders/?status=${category.statuses.join(",")}` : "/orders/";
+};
+
 export default function HistoryPage() {
   const { user } = useAuth();
   const router = useRouter();
   const [orders, setOrders] = useState<Order[]>([]);
+  const [summary, setSummary] = useState<OrderSummary | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeTab, setActiveTab] = useState("All");
   const [showReviewModal, setShowReviewModal] = useState(false);
   const [selectedOrder, setSelectedOrder] = useState<Order | null>(null);
@@ -39,26 +69,50 @@ export default function HistoryPage() {
   const [comment, setComment] = useState("");
   const [isSubmitting, setIsSubmitting] = useState(false);
 
+  const fetchOrders = useCallback(async () => {
+    setLoading(true);
+    try {
+      const data: Page<Order> = await apiRequest(ordersEndpoint(activeTab));
+      setOrders(data.results);
+      setNextCursor(data.next);
+    } catch (err: unknown) {
+      const errorMessage = err instanceof Error ? err.message : "Failed to load order history.";
+      console.error(errorMessage);
+    } finally {
+      setLoading(false);
+    }
+  }, [activeTab]);
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data: Page<Order> = await apiRequest(withCursor(ordersEndpoint(activeTab), nextCursor));
+      setOrders((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next);
+    } catch (err: unknown) {
+      const errorMessage = err instanceof Error ? err.message : "Failed to load more orders.";
+      console.error(errorMessage);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (!user) {
       router.push("/auth/login");
       return;
     }
-
-    const fetchOrders = async () => {
-      try {
-        const data = await apiRequest("/orders/");
-        setOrders(data);
-      } catch (err: unknown) {
-        const errorMessage = err instanceof Error ? err.message : "Failed to load order history.";
-        console.error(errorMessage);
-      } finally {
-        setLoading(false);
-      }
-    };
-
     fetchOrders();
-  }, [user, router]);
+  }, [user, router, fetchOrders]);
+
+  useEffect(() => {
+    if (!user) return;
+    // Totals cover the whole history, so they come from the server rather than the loaded pages
+    apiRequest("/orders/summary/")
+      .then(setSummary)
+      .catch((err: unknown) => console.error("Failed to load order summary", err));
+  }, [user]);
 
   const handleSubmitReview = async () => {
     if (!selectedOrder) return;
@@ -72,9 +126,10 @@ export default function HistoryPage() {
           comment,
         }),
       });
-      // Refresh orders
-      const updatedOrders = await apiRequest("/orders/");
-      setOrders(updatedOrders);
+      // Mark the order reviewed without refetching the whole history
+      setOrders((prev) =>
+        prev.map((o) => (o.order_id === selectedOrder.order_id ? { ...o, is_reviewed: true } : o)),
+      );
       setShowReviewModal(false);
       setComment("");
       setRating(5);
@@ -88,27 +143,24 @@ export default function HistoryPage() {
 
   const stats = useMemo(() => {
     return [
-      { label: "Orders", value: orders.length, icon: Calendar, color: "var(--primary)" },
+      { label: "Orders", value: summary?.orders ?? 0, icon: Calendar, color: "var(--primary)" },
       {
         label: "Items",
-        value: orders.reduce((s, o) => s + o.items.length, 0),
+        value: summary?.items ?? 0,
         icon: Package,
         color: "var(--secondary)",
       },
       {
         label: "Spent",
-        value: formatMoney(
-          orders.reduce((s, o) => s + o.total_price, 0),
-          {
-            minimumFractionDigits: 0,
-            maximumFractionDigits: 0,
-          },
-        ),
+        value: formatMoney(summary?.spent ?? 0, {
+          minimumFractionDigits: 0,
+          maximumFractionDigits: 0,
+        }),
         icon: Receipt,
         color: "var(--gold)",
       },
     ];
-  }, [orders]);
+  }, [summary]);
 
   if (loading) {
     return (
@@ -187,22 +239,8 @@ export default function HistoryPage() {
           {/* Orders Display */}
           <div className="space-y-8">
             {(() => {
-              const categories = [
-                { id: "Pending", title: "Pending Orders", statuses: ["PENDING"] },
-                {
-                  id: "Active",
-                  title: "In Progress",
-                  statuses: ["ACCEPTED", "PICKED_UP", "CLEANING", "READY"],
-                },
-                {
-                  id: "History",
-                  title: "Completed",
-                  statuses: ["DELIVERED", "COMPLETED", "CANCELLED"],
-                },
-              ];
-
               const filteredCategories =
-                activeTab === "All" ? categories : categories.filter((c) => c.id === activeTab);
+                activeTab === "All" ? CATEGORIES : CATEGORIES.filter((c) => c.id === activeTab);
               let hasOrders = false;
 
               const content = filteredCategories.map((cat) => {
@@ -377,6 +415,18 @@ export default function HistoryPage() {
               return content;
             })()}
           </div>
+
+          {nextCursor && (
+            <div className="flex justify-center !mt-8">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="btn btn-secondary btn-sm"
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
         </div>
       </section>
 
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useMemo, useEffect } from "react";
+import { useState, useMemo, useEffect, useRef } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Check, Plus, Minus, ArrowRight, LogIn, Loader2, Search, Filter } from "lucide-react";
 import { useAuth } from "@/context/AuthContext";
@@ -34,6 +34,12 @@ export default function OrdersPage() {
   const [expanded, setExpanded] = useState<string | null>(null);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [submittedId, setSubmittedId] = useState<string | null>(null);
+  // Reused when the same basket is retried so the backend never creates it twice
+  const idempotencyKey = useRef<string | null>(null);
+
+  useEffect(() => {
+    idempotencyKey.current = null;
+  }, [selected]);
 
   useEffect(() => {
     async function fetchCatalog() {
@@ -109,6 +115,7 @@ export default function OrdersPage() {
     }
 
     setIsSubmitting(true);
+    const orderKey = (idempotencyKey.current ??= crypto.randomUUID());
     try {
       const itemsArray = Array.from(selected.values()).map((item) => ({
         name: item.name,
@@ -120,6 +127,7 @@ export default function OrdersPage() {
 
       const res = await apiRequest("/orders/", {
         method: "POST",
+        headers: { "Idempotency-Key": orderKey },
         body: JSON.stringify({
           items: itemsArray,
           total_price: total,
@@ -0,0 +1,76 @@
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from services.notification_outbox import notification_outbox
+from services.notification_service import notification_service
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued notifications from the notification outbox with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain whatever is currently due and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_WORKER_BATCH_SIZE', 20),
+            help='Maximum number of entries claimed per iteration',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'NOTIFICATION_WORKER_POLL_INTERVAL', 2.0),
+            help='Seconds to sleep when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(self.style.SUCCESS('Notification worker started'))
+
+        while self._running:
+            try:
+                batch = notification_outbox.claim_batch(options['batch_size'])
+            except Exception as e:
+                self.stderr.write(f'Failed to read notification outbox: {e}')
+                batch = []
+                if options['once']:
+                    break
+
+            if batch:
+                self.process(batch)
+
+            if options['once'] and not batch:
+                break
+            if not batch:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write('Notification worker stopped')
+
+    def process(self, batch):
+        # Entries in a batch are independent, so send them concurrently; emails
+        # share SMTP connections in batches (see NotificationService.deliver_many)
+        results = notification_service.deliver_many(batch, on_complete=self.record)
+        for entry, result in zip(batch, results):
+            if result.get('in_flight'):
+                # Still sending: retrying now could deliver it twice. The entry
+                # stays claimed and is settled by `record` when the send ends.
+                continue
+            self.record(entry, result)
+
+    def record(self, entry, result):
+        if result['success']:
+            notification_outbox.mark_sent(entry)
+        else:
+            error = result.get('error') or f"{entry['channel']} delivery to {entry['recipient']} failed"
+            notification_outbox.mark_failed(entry, error)
+
+    def _stop(self, signum, frame):
+        self._running = False
@@ -1,3 +1,174 @@
-from django.test import TestCase
+import smtplib
+import threading
+import time
+from unittest import mock
+from django.core import mail
+from django.test import SimpleTestCase
+from services.notification_dispatcher import FanOutDispatcher, fanout_dispatcher
+from services.notification_service import EmailChannel, NotificationService
 
-# Create your tests here.
+
+def make_messages(channel, count):
+    return [{'channel': channel, 'recipient': f'+23350000000{i}', 'message': 'hi'} for i in range(count)]
+
+
+class FanOutDispatcherTests(SimpleTestCase):
+    def test_reports_each_result(self):
+        dispatcher = FanOutDispatcher(max_workers=4, channel_limits={'sms': 2}, deadline=5)
+
+        def send(message):
+            if message['recipient'].endswith('1'):
+                raise RuntimeError('Twilio error')
+            return True
+
+        results = dispatcher.dispatch(make_messages('sms', 3), send)
+
+        self.assertEqual([r['success'] for r in results], [True, False, True])
+        self.assertEqual(results[1]['error'], 'Twilio error')
+
+    def test_channel_limit_is_respected(self):
+        dispatcher = FanOutDispatcher(max_workers=8, channel_limits={'email': 2}, deadline=5)
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def send(message):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return True
+
+        results = dispatcher.dispatch(make_messages('email', 6), send)
+
+        self.assertTrue(all(r['success'] for r in results))
+        self.assertEqual(state['peak'], 2)
+
+    def test_send_running_at_deadline_is_in_flight_not_failed(self):
+        dispatcher = FanOutDispatcher(max_workers=2, channel_limits={'sms': 1}, deadline=0.05)
+        release = threading.Event()
+        completed = []
+        finished = threading.Event()
+
+        def send(message):
+            release.wait(5)
+            return True
+
+        def on_complete(message, result):
+            completed.append((message['recipient'], result))
+            finished.set()
+
+        results = dispatcher.dispatch(make_messages('sms', 2), send, on_complete=on_complete)
+
+        # The first message was sending; the second never got the channel's only slot
+        self.assertIsNone(results[0]['success'])
+        self.assertTrue(results[0]['in_flight'])
+        self.assertFalse(results[1]['success'])
+        self.assertNotIn('in_flight', results[1])
+
+        release.set()
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(completed, [(results[0]['recipient'], {'success': True})])
+
+
+def make_emails(count):
+    return [{'channel': 'email', 'recipient': f'user{i}@example.com', 'message': 'hi'} for i in range(count)]
+
+
+class FakeConnection:
+    def __init__(self, refused=()):
+        self.refused = refused
+        self.sent = []
+        self.closed = False
+
+    def send_messages(self, emails):
+        if emails[0].to[0] in self.refused:
+            raise smtplib.SMTPRecipientsRefused({emails[0].to[0]: (550, b'No such user')})
+        self.sent.extend(emails)
+        return len(emails)
+
+    def close(self):
+        self.closed = True
+
+
+class EmailChannelTests(SimpleTestCase):
+    def test_send_many_uses_one_connection(self):
+        channel = EmailChannel()
+
+        with mock.patch.object(channel, '_open', wraps=channel._open) as opened:
+            results = channel.send_many(make_emails(3))
+
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual([email.to for email in mail.outbox], [['user0@example.com'], ['user1@example.com'], ['user2@example.com']])
+
+    def test_refused_recipient_does_not_abort_batch(self):
+        channel = EmailChannel()
+        connection = FakeConnection(refused=['user1@example.com'])
+
+        with mock.patch.object(channel, '_open', return_value=connection):
+            results = channel.send_many(make_emails(3))
+
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(len(connection.sent), 2)
+        self.assertFalse(connection.closed)
+        self.assertEqual(len(channel._idle), 1)
+
+    def test_idle_pool_is_capped_at_email_concurrency(self):
+        channel = EmailChannel()
+        connections = [FakeConnection() for _ in range(3)]
+
+        with mock.patch.object(fanout_dispatcher, 'channel_limit', return_value=2):
+            for connection in connections:
+                channel._checkin(connection)
+
+        self.assertEqual([c for c, _ in channel._idle], connections[:2])
+        self.assertTrue(connections[2].closed)
+
+
+class DeliverManyTests(SimpleTestCase):
+    def test_emails_go_out_in_batches(self):
+        service = NotificationService()
+        sms = {'channel': 'sms', 'recipient': '+233500000000', 'message': 'hi'}
+        messages = make_emails(2) + [sms] + make_emails(3)[2:]
+
+        def send_many(batch):
+            return [m['recipient'] != 'user1@example.com' for m in batch]
+
+        with mock.patch.object(fanout_dispatcher, 'channel_limit', return_value=2), \
+                mock.patch.object(service.channels['email'], 'send_many', side_effect=send_many) as sent, \
+                mock.patch.object(service.channels['sms'], 'send', return_value=True):
+            results = service.deliver_many(messages)
+
+        self.assertEqual(sorted(len(call.args[0]) for call in sent.call_args_list), [1, 2])
+        self.assertEqual(
+            [(r['recipient'], r['success']) for r in results],
+            [('user0@example.com', True), ('user1@example.com', False), ('+233500000000', True), ('user2@example.com', True)],
+        )
+
+    def test_batch_sending_at_deadline_completes_per_message(self):
+        service = NotificationService()
+        release = threading.Event()
+        completed = []
+        finished = threading.Event()
+
+        def send_many(batch):
+            release.wait(5)
+            return [True] * len(batch)
+
+        def on_complete(message, result):
+            completed.append((message['recipient'], result))
+            if len(completed) == 2:
+                finished.set()
+
+        with mock.patch.object(fanout_dispatcher, 'channel_limit', return_value=1), \
+                mock.patch.object(service.channels['email'], 'send_many', side_effect=send_many):
+            results = service.deliver_many(make_emails(2), deadline=0.05, on_complete=on_complete)
+
+            self.assertEqual([r['in_flight'] for r in results], [True, True])
+            self.assertEqual([r['recipient'] for r in results], ['user0@example.com', 'user1@example.com'])
+            release.set()
+            self.assertTrue(finished.wait(5))
+
+        self.assertEqual(completed, [('user0@example.com', {'success': True}), ('user1@example.com', {'success': True})])
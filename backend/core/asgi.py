@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to ORDER_EVENTS_PATH are served by the server-sent events app in
+core/events.py; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -13,4 +15,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it loads models and settings
+from django.conf import settings  # noqa: E402
+from core.events import order_events_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"].rstrip("/") == settings.ORDER_EVENTS_PATH.rstrip("/"):
+        await order_events_app(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -0,0 +1,120 @@
+"""
+Server-Sent Events for Order Status Changes
+
+A small ASGI app mounted by core/asgi.py at ORDER_EVENTS_PATH. Clients open
+an EventSource on it and receive one `order_status` event per transition of
+an order they may see:
+- Customers get their own orders, riders the orders assigned to them,
+  admins every order
+- `?order_id=` narrows the stream to a single order
+- Browsers cannot set headers on EventSource, so instead of the JWT the
+  stream takes `?ticket=`: a single-use, short-lived ticket the client gets
+  from an authenticated POST to /api/orders/events/ticket/ (see
+  services/stream_tickets.py), so no reusable credential reaches access logs
+- A comment line is sent every ORDER_EVENTS_KEEPALIVE seconds so proxies
+  keep the connection open
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from services.order_events import ADMIN_CHANNEL, TICKET_PURPOSE, order_event_bus
+from services.stream_tickets import stream_ticket_store
+
+logger = logging.getLogger(__name__)
+
+
+def _load_user(ticket):
+    user_id = stream_ticket_store.redeem(ticket, TICKET_PURPOSE)
+    if user_id is None:
+        return None
+    User = get_user_model()
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def _channels_for_user(user):
+    if user.role in ['ADMIN', 'SUPER_ADMIN']:
+        return [ADMIN_CHANNEL]
+    if user.role == 'RIDER':
+        return [f'rider:{user.id}']
+    return [f'user:{user.id}']
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers') or []).get(b'origin')
+    if origin and (
+        getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False)
+        or origin.decode() in getattr(settings, 'CORS_ALLOWED_ORIGINS', [])
+    ):
+        return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+    return []
+
+
+async def _send_error(send, scope, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + _cors_headers(scope),
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'error': message}).encode()})
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def order_events_app(scope, receive, send):
+    if scope['method'] != 'GET':
+        await _send_error(send, scope, 405, 'Method not allowed')
+        return
+
+    params = parse_qs(scope.get('query_string', b'').decode())
+    ticket = params.get('ticket', [None])[0]
+    order_id = params.get('order_id', [None])[0]
+
+    user = await sync_to_async(_load_user)(ticket) if ticket else None
+    if user is None:
+        await _send_error(send, scope, 401, 'Authentication required')
+        return
+
+    keepalive = getattr(settings, 'ORDER_EVENTS_KEEPALIVE', 15)
+    subscription = order_event_bus.subscribe(_channels_for_user(user))
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+        while not disconnect.done():
+            next_event = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({next_event, disconnect}, timeout=keepalive, return_when=asyncio.FIRST_COMPLETED)
+            if next_event not in done:
+                next_event.cancel()
+                if not disconnect.done():
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+
+            event = next_event.result()
+            if order_id and event.get('order_id') != order_id:
+                continue
+            body = f"event: order_status\ndata: {json.dumps(event)}\n\n".encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError as e:
+        logger.info(f"Order events stream closed: {e}")
+    finally:
+        subscription.close()
+        disconnect.cancel()
@@ -0,0 +1,101 @@
+"""
+HTTP Caching Helpers for Public Endpoints
+
+Public, anonymous endpoints (catalog, homepage reviews) are served from a
+process-local payload cache and carry validators so browsers and CDNs can
+revalidate cheaply:
+- Strong ETag derived from the payload content
+- Last-Modified from the newest document in the payload
+- `304 Not Modified` on matching If-None-Match / If-Modified-Since
+- `Cache-Control: public, max-age=PUBLIC_CACHE_MAX_AGE`
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import timezone
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class CachedPayload:
+    def __init__(self, data, etag, last_modified=None, version=None, expires_at=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version = version
+        self.expires_at = expires_at
+
+
+def compute_etag(data):
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+
+
+class ResponseCache:
+    """
+    Cache one payload built by `loader`.
+
+    `loader` returns (data, last_modified). The cached payload is rebuilt when
+    `ttl` seconds have passed (if set), when `version_fn()` returns a new value
+    (if set), or after `invalidate()`.
+    """
+
+    def __init__(self, loader, ttl=None, version_fn=None):
+        self._loader = loader
+        self._ttl = ttl
+        self._version_fn = version_fn
+        self._lock = threading.Lock()
+        self._payload = None
+
+    def get(self):
+        version = self._version_fn() if self._version_fn else None
+        with self._lock:
+            payload = self._payload
+        if (
+            payload is not None
+            and payload.version == version
+            and (payload.expires_at is None or time.monotonic() < payload.expires_at)
+        ):
+            return payload
+
+        data, last_modified = self._loader()
+        payload = CachedPayload(
+            data=data,
+            etag=compute_etag(data),
+            last_modified=last_modified,
+            version=version,
+            expires_at=time.monotonic() + self._ttl if self._ttl else None,
+        )
+        with self._lock:
+            self._payload = payload
+        return payload
+
+    def invalidate(self):
+        with self._lock:
+            self._payload = None
+
+
+def conditional_response(request, payload, max_age=None):
+    """Return a 304 if the client's validators match `payload`, else a 200 with the data."""
+    if max_age is None:
+        max_age = getattr(settings, 'PUBLIC_CACHE_MAX_AGE', 60)
+
+    last_modified = None
+    if payload.last_modified is not None:
+        moment = payload.last_modified
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        last_modified = int(moment.timestamp())
+
+    response = get_conditional_response(request, etag=payload.etag, last_modified=last_modified)
+    if response is None:
+        response = Response(payload.data)
+
+    response['ETag'] = payload.etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,93 @@
+"""
+BSON-aware JSON Renderer
+
+Views can return MongoDB documents as they come out of pymongo. The renderer
+encodes BSON types at any depth in a single pass, so nested values such as
+`status_history[].timestamp` are handled too:
+- ObjectId -> string, datetime -> ISO 8601, Decimal128 -> number
+- Uses orjson when it is installed and falls back to the standard library
+- Views that set `allow_field_selection = True` honour `?fields=a,b,c`,
+  trimming each returned document to those top-level keys
+"""
+from datetime import datetime
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def encode_bson(obj):
+    """Convert one non-JSON value; raises TypeError for types it does not know."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class MongoJSONEncoder(JSONEncoder):
+    def default(self, obj):
+        try:
+            return encode_bson(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+_drf_encoder = MongoJSONEncoder()
+
+
+def _orjson_default(obj):
+    # orjson handles datetimes itself; everything else DRF knows about
+    # (Decimal, lazy translation strings, QuerySets...) goes through its encoder
+    return _drf_encoder.default(obj)
+
+
+def select_fields(data, fields):
+    """Trim a document, a list of documents or a {'results': [...]} page to `fields`."""
+    if isinstance(data, list):
+        return [select_fields(item, fields) for item in data]
+    if isinstance(data, dict):
+        if isinstance(data.get('results'), list):
+            return {**data, 'results': select_fields(data['results'], fields)}
+        return {key: value for key, value in data.items() if key in fields}
+    return data
+
+
+class MongoJSONRenderer(JSONRenderer):
+    encoder_class = MongoJSONEncoder
+
+    def get_selected_fields(self, renderer_context):
+        view = renderer_context.get('view')
+        request = renderer_context.get('request')
+        response = renderer_context.get('response')
+        if not getattr(view, 'allow_field_selection', False) or request is None:
+            return None
+        if response is not None and response.status_code >= 400:
+            return None
+        raw = request.query_params.get('fields', '')
+        fields = {field.strip() for field in raw.split(',') if field.strip()}
+        return fields or None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        fields = self.get_selected_fields(renderer_context)
+        if fields:
+            data = select_fields(data, fields)
+
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or indent is not None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -14,6 +14,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 from dotenv import load_dotenv
 
@@ -95,10 +96,13 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
+# The app is served through core.asgi, where persistent connections leak (each
+# request runs in its own thread-sensitive context), so connections are closed
+# after every request by default. Pool with pgbouncer in front of Postgres.
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / os.getenv('SQLITE_DB_NAME', 'db.sqlite3')}",
-        conn_max_age=600,
+        conn_max_age=int(os.getenv("DB_CONN_MAX_AGE", "0")),
         conn_health_checks=True,
     )
 }
@@ -106,6 +110,37 @@ DATABASES = {
 # MongoDB Configuration
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "AbbaEZwash")
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_PAGE_SIZE = int(os.getenv("MONGO_PAGE_SIZE", "50"))
+MONGO_MAX_PAGE_SIZE = int(os.getenv("MONGO_MAX_PAGE_SIZE", "200"))
+# Seconds a worker trusts its in-memory catalog before reloading it
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Cache-Control max-age (and in-process TTL) for the public catalog/reviews endpoints
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "60"))
+# Seconds a rider's dashboard counters are cached between polls
+RIDER_STATS_CACHE_TTL = int(os.getenv("RIDER_STATS_CACHE_TTL", "30"))
+# Seconds before an unfinished Idempotency-Key claim can be taken over by a retry
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+# Order status push (server-sent events, served by core/asgi.py)
+ORDER_EVENTS_PATH = os.getenv("ORDER_EVENTS_PATH", "/api/events/orders/")
+ORDER_EVENTS_KEEPALIVE = float(os.getenv("ORDER_EVENTS_KEEPALIVE", "15"))
+ORDER_EVENTS_QUEUE_SIZE = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "100"))
+# Seconds a client has to open the stream with a ticket from /api/orders/events/ticket/
+STREAM_TICKET_TTL = int(os.getenv("STREAM_TICKET_TTL", "30"))
+# Tail a MongoDB change stream so events reach every worker (needs a replica set,
+# e.g. Atlas). Off locally, where a standalone mongod has no change streams.
+ORDER_EVENTS_CHANGE_STREAM = _get_bool("ORDER_EVENTS_CHANGE_STREAM", not DEBUG)
+
+# Rider location ingestion (services/rider_locations.py)
+LOCATION_MAX_BATCH = int(os.getenv("LOCATION_MAX_BATCH", "100"))
+# Skip hot-store writes for riders who moved less than this many metres...
+LOCATION_MIN_DISTANCE = float(os.getenv("LOCATION_MIN_DISTANCE", "10"))
+# ...unless the stored position is older than this many seconds
+LOCATION_MAX_SILENCE = int(os.getenv("LOCATION_MAX_SILENCE", "30"))
+# At most one track point per rider per interval (seconds)
+LOCATION_TRACK_INTERVAL = int(os.getenv("LOCATION_TRACK_INTERVAL", "30"))
+# How often the latest position is copied to Postgres (seconds)
+LOCATION_PERSIST_INTERVAL = int(os.getenv("LOCATION_PERSIST_INTERVAL", "300"))
 
 AUTH_USER_MODEL = "users.User"
 
@@ -151,6 +186,11 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # Encodes ObjectId/datetime/Decimal128 from MongoDB documents directly
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.MongoJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 # JWT Settings
@@ -167,6 +207,8 @@ SIMPLE_JWT = {
 CORS_ALLOW_ALL_ORIGINS = _get_bool("CORS_ALLOW_ALL_ORIGINS", False)
 CORS_ALLOWED_ORIGINS = _get_list("CORS_ALLOWED_ORIGINS")
 CSRF_TRUSTED_ORIGINS = _get_list("CSRF_TRUSTED_ORIGINS")
+# Allow clients to send Idempotency-Key on retried POSTs
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 if DEBUG and not CORS_ALLOWED_ORIGINS:
     CORS_ALLOWED_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -181,6 +223,9 @@ EMAIL_USE_TLS = _get_bool("EMAIL_USE_TLS", True)
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "Abba EZWash <noreply@abbaezwash.com>")
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "10"))
+# EmailChannel keeps its SMTP connection open between sends for this many idle seconds
+EMAIL_CONNECTION_MAX_IDLE = int(os.getenv("EMAIL_CONNECTION_MAX_IDLE", "60"))
 
 # Twilio Configuration (SMS & WhatsApp)
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -189,6 +234,31 @@ TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "")
 TWILIO_MESSAGING_SERVICE_SID = os.getenv("TWILIO_MESSAGING_SERVICE_SID", "")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "")
 ADMIN_PHONE_NUMBER = os.getenv("ADMIN_PHONE_NUMBER", "+233543955261") # Defaulting to the helpline provided in history
+# Shared Twilio HTTP transport (keep-alive pool reused by SMS, WhatsApp and TwilioService)
+TWILIO_HTTP_POOL_SIZE = int(os.getenv("TWILIO_HTTP_POOL_SIZE", "10"))
+TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", "10"))
+TWILIO_HTTP_MAX_RETRIES = int(os.getenv("TWILIO_HTTP_MAX_RETRIES", "2"))
+
+# Notification outbox (drained by `manage.py run_notification_worker`). Every deploy
+# target must run the worker: the `worker` process in Procfile/.do/app.yaml, or on
+# Railway scripts/railway-start.sh (or a service using railway.worker.json).
+# Turn the outbox off where no worker runs and notifications are sent inline.
+NOTIFICATION_OUTBOX_ENABLED = _get_bool("NOTIFICATION_OUTBOX_ENABLED", True)
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_RETRY_BASE_SECONDS = int(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+NOTIFICATION_RETRY_MAX_SECONDS = int(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+# Sends still in flight keep their claim; keep this above the slowest send (Twilio timeout x retries)
+NOTIFICATION_LOCK_TIMEOUT = int(os.getenv("NOTIFICATION_LOCK_TIMEOUT", "300"))
+NOTIFICATION_WORKER_BATCH_SIZE = int(os.getenv("NOTIFICATION_WORKER_BATCH_SIZE", "20"))
+NOTIFICATION_WORKER_POLL_INTERVAL = float(os.getenv("NOTIFICATION_WORKER_POLL_INTERVAL", "2"))
+# Concurrent fan-out of independent messages (worker batches and inline sends)
+NOTIFICATION_FANOUT_MAX_WORKERS = int(os.getenv("NOTIFICATION_FANOUT_MAX_WORKERS", "8"))
+NOTIFICATION_FANOUT_DEADLINE = float(os.getenv("NOTIFICATION_FANOUT_DEADLINE", "15"))
+NOTIFICATION_CHANNEL_CONCURRENCY = {
+    "sms": int(os.getenv("NOTIFICATION_SMS_CONCURRENCY", "4")),
+    "whatsapp": int(os.getenv("NOTIFICATION_WHATSAPP_CONCURRENCY", "2")),
+    "email": int(os.getenv("NOTIFICATION_EMAIL_CONCURRENCY", "2")),
+}
 
 # For development, optionally use console email backend
 if _get_bool("DEBUG_EMAIL", False):
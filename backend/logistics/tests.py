@@ -1,3 +1,111 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from services.mongo_service import mongo_service
+from services.testing import MongoTestCase
+from users.models import RiderProfile
 
-# Create your tests here.
+User = get_user_model()
+
+OSU = {'lat': 5.556, 'lng': -0.182}
+MADINA = {'lat': 5.668, 'lng': -0.166}
+
+
+def make_user(username, role='CUSTOMER', **fields):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **fields
+    )
+
+
+class RiderLocationTests(MongoTestCase):
+    url = '/api/logistics/rider/location/'
+
+    def setUp(self):
+        super().setUp()
+        self.rider = make_user('rider', role='RIDER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.rider)
+
+    def ping(self, location):
+        return self.client.post(self.url, {'location': location}, format='json')
+
+    def test_readers_see_position_not_yet_persisted(self):
+        self.ping(OSU)
+        self.ping(MADINA)
+
+        # Postgres is only refreshed every LOCATION_PERSIST_INTERVAL
+        self.assertEqual(RiderProfile.objects.get(user=self.rider).current_location, OSU)
+
+        profile = self.client.get('/api/users/profile/')
+        self.assertEqual(profile.data['location'], MADINA)
+        self.assertEqual(profile.data['profile_data']['current_location'], MADINA)
+
+        admin = APIClient()
+        admin.force_authenticate(make_user('admin', role='ADMIN'))
+        riders = admin.get('/api/orders/admin/riders/')
+        users = admin.get('/api/users/superadmin/users/', {'role': 'RIDER'})
+        self.assertEqual(riders.data[0]['location'], MADINA)
+        self.assertEqual(users.data[0]['location'], MADINA)
+
+    def test_rider_without_pings_keeps_stored_location(self):
+        RiderProfile.objects.filter(user=self.rider).update(current_location=OSU)
+        User.objects.filter(pk=self.rider.pk).update(location=OSU)
+        self.client.force_authenticate(User.objects.get(pk=self.rider.pk))
+
+        profile = self.client.get('/api/users/profile/')
+
+        self.assertEqual(profile.data['location'], OSU)
+        self.assertEqual(profile.data['profile_data']['current_location'], OSU)
+
+    def test_single_location_may_be_a_plain_value(self):
+        response = self.ping('Osu, Oxford Street')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['location'], 'Osu, Oxford Street')
+        self.assertEqual(RiderProfile.objects.get(user=self.rider).current_location, 'Osu, Oxford Street')
+        self.assertEqual(self.ping('').status_code, 400)
+
+    def test_batch_pings_must_be_location_objects(self):
+        response = self.client.post(self.url, {'pings': [OSU, 'Osu']}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RiderSyncTests(MongoTestCase):
+    url = '/api/logistics/rider/sync/'
+
+    def setUp(self):
+        super().setUp()
+        self.rider = make_user('rider', role='RIDER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.rider)
+        now = datetime.utcnow()
+        orders = mongo_service.get_collection('orders')
+        orders.insert_many([
+            {'order_id': 'O-OLD', 'assigned_rider_id': str(self.rider.id), 'status': 'ASSIGNED',
+             'created_at': now - timedelta(hours=2), 'updated_at': now - timedelta(hours=2)},
+            {'order_id': 'O-NEW', 'assigned_rider_id': str(self.rider.id), 'status': 'ASSIGNED',
+             'created_at': now, 'updated_at': now},
+        ])
+        self.since = now - timedelta(hours=1)
+
+    def sync(self, query):
+        # Sent as typed, without URL-encoding
+        return self.client.get(f'{self.url}?updated_since={query}')
+
+    def test_accepts_unencoded_offset(self):
+        response = self.sync(f'{self.since.isoformat()}+00:00')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['order_id'] for o in response.data['orders']], ['O-NEW'])
+
+    def test_accepts_zulu_and_returned_watermarks(self):
+        # The API hands out naive UTC watermarks
+        for query in [f'{self.since.isoformat()}Z', self.since.isoformat()]:
+            response = self.sync(query)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([o['order_id'] for o in response.data['orders']], ['O-NEW'])
+
+    def test_rejects_garbage(self):
+        self.assertEqual(self.sync('yesterday').status_code, 400)
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     RiderOrdersView,
     RiderOrderDetailView,
+    RiderSyncView,
     PickupOrderView,
     DeliverOrderView,
     RiderLocationUpdateView,
@@ -17,6 +18,7 @@ urlpatterns = [
     path('rider/status-toggle/', RiderStatusToggleView.as_view(), name='rider-status-toggle'),
     path('rider/orders/', RiderOrdersView.as_view(), name='rider-orders'),
     path('rider/orders/<str:order_id>/', RiderOrderDetailView.as_view(), name='rider-order-detail'),
+    path('rider/sync/', RiderSyncView.as_view(), name='rider-sync'),
     path('rider/accept/<str:order_id>/', RiderAcceptTaskView.as_view(), name='rider-accept'),
     path('rider/pickup/<str:order_id>/', PickupOrderView.as_view(), name='rider-pickup'),
     path('rider/deliver/<str:order_id>/', DeliverOrderView.as_view(), name='rider-deliver'),
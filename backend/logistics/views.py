@@ -6,7 +6,9 @@ Handles pickup/delivery workflow:
 - Update order status (PICKED_UP, DELIVERED)
 - Location tracking
 """
-from datetime import datetime
+import re
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
 from django.db import models
 from rest_framework import status
 from rest_framework.views import APIView
@@ -14,15 +16,22 @@ from rest_framework.response import Response
 from users.permissions import IsRider, IsRiderOrAdmin, IsAdmin
 from services.mongo_service import mongo_service
 from services.notification_service import notification_service
+from services.rider_locations import InvalidPing, normalize_location, normalize_pings, rider_location_store
+from orders import projections
+from orders.state_machine import transition, TransitionError
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 
 User = get_user_model()
 
+# A time followed by a UTC offset whose `+` was decoded to a space
+UNENCODED_OFFSET = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}:?\d{2})$')
+
 
 class RiderOrdersView(APIView):
     """Get orders assigned to the current rider."""
     permission_classes = [IsRider]
+    allow_field_selection = True
 
     def get(self, request):
         rider_id = str(request.user.id)
@@ -32,14 +41,7 @@ class RiderOrdersView(APIView):
         orders = list(collection.find({
             'assigned_rider_id': rider_id,
             'status': {'$in': ['ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'READY']}
-        }).sort('created_at', -1))
-
-        for order in orders:
-            order['_id'] = str(order['_id'])
-            if isinstance(order.get('created_at'), datetime):
-                order['created_at'] = order['created_at'].isoformat()
-            if isinstance(order.get('updated_at'), datetime):
-                order['updated_at'] = order['updated_at'].isoformat()
+        }, projections.RIDER).sort('created_at', -1))
 
         return Response(orders)
 
@@ -59,54 +61,81 @@ class RiderOrderDetailView(APIView):
         if request.user.role == 'RIDER' and order.get('assigned_rider_id') != str(request.user.id):
             return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
 
-        order['_id'] = str(order['_id'])
-        if isinstance(order.get('created_at'), datetime):
-            order['created_at'] = order['created_at'].isoformat()
-
         return Response(order)
 
 
-class PickupOrderView(APIView):
-    """Rider marks order as picked up."""
+class RiderSyncView(APIView):
+    """
+    Delta sync for the rider app.
+
+    GET ?updated_since=<watermark> returns the rider's orders changed after the
+    watermark, plus the IDs of orders that were reassigned to someone else.
+    Without a watermark every order assigned to the rider is returned. Clients
+    store the returned `watermark` and send it on the next poll.
+    """
     permission_classes = [IsRider]
 
-    def post(self, request, order_id):
+    # Orders written just before the query may become visible just after it
+    watermark_overlap = timedelta(seconds=5)
+
+    def parse_watermark(self, value):
+        # An unencoded `+00:00` offset arrives as ` 00:00` in the query string
+        value = UNENCODED_OFFSET.sub(r'\1+\2', value.strip())
+        if value.endswith(('Z', 'z')):
+            value = value[:-1] + '+00:00'
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment
+
+    def get(self, request):
+        rider_id = str(request.user.id)
+        now = datetime.utcnow()
+        since = request.query_params.get('updated_since')
         collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
 
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+        if since:
+            try:
+                since = self.parse_watermark(since)
+            except ValueError:
+                return Response({'error': 'Invalid updated_since'}, status=status.HTTP_400_BAD_REQUEST)
+            query = {'$or': [
+                {'assigned_rider_id': rider_id, 'updated_at': {'$gt': since}},
+                {'unassigned_rider_ids': rider_id, 'updated_at': {'$gt': since}},
+            ]}
+        else:
+            query = {'assigned_rider_id': rider_id}
+
+        orders = []
+        removed = []
+        for order in collection.find(query, projections.RIDER).sort('updated_at', 1):
+            if order.get('assigned_rider_id') == rider_id:
+                orders.append(order)
+            else:
+                removed.append(order['order_id'])
 
-        if order.get('assigned_rider_id') != str(request.user.id):
-            return Response({'error': 'Not your assigned order'}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            'orders': orders,
+            'removed': removed,
+            'watermark': (now - self.watermark_overlap).isoformat(),
+            'full': not since
+        })
 
-        if order['status'] != 'ACCEPTED' and order['status'] != 'ASSIGNED':
-             # Allow pickup from ASSIGNED too if rider skips explicit accept
-             pass
-        elif order['status'] != 'ACCEPTED':
-            return Response({'error': f"Cannot pickup order with status: {order['status']}"}, 
-                          status=status.HTTP_400_BAD_REQUEST)
 
-        # Update order status
+class PickupOrderView(APIView):
+    """Rider marks order as picked up."""
+    permission_classes = [IsRider]
+
+    def post(self, request, order_id):
+        # Pickup is allowed from ASSIGNED too, in case the rider skips the explicit accept
         pickup_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'status': 'PICKED_UP',
-                    'picked_up_at': pickup_time,
-                    'updated_at': pickup_time,
-                },
-                '$push': {
-                    'status_history': {
-                        'status': 'PICKED_UP',
-                        'timestamp': pickup_time,
-                        'by': str(request.user.id),
-                        'note': request.data.get('note', '')
-                    }
-                }
-            }
-        )
+        try:
+            order = transition(
+                order_id, 'PICKED_UP', by=request.user.id, note=request.data.get('note', ''),
+                rider_id=request.user.id, set_fields={'picked_up_at': pickup_time}
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Notify customer
         customer = User.objects.filter(id=order.get('user_id')).first()
@@ -126,39 +155,14 @@ class DeliverOrderView(APIView):
     permission_classes = [IsRider]
 
     def post(self, request, order_id):
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
-
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        if order.get('assigned_rider_id') != str(request.user.id):
-            return Response({'error': 'Not your assigned order'}, status=status.HTTP_403_FORBIDDEN)
-
-        if order['status'] != 'READY':
-            return Response({'error': f"Cannot deliver order with status: {order['status']}"}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-
-        # Update order status
         delivery_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'status': 'DELIVERED',
-                    'delivered_at': delivery_time,
-                    'updated_at': delivery_time,
-                },
-                '$push': {
-                    'status_history': {
-                        'status': 'DELIVERED',
-                        'timestamp': delivery_time,
-                        'by': str(request.user.id),
-                        'note': request.data.get('note', '')
-                    }
-                }
-            }
-        )
+        try:
+            order = transition(
+                order_id, 'DELIVERED', by=request.user.id, note=request.data.get('note', ''),
+                rider_id=request.user.id, set_fields={'delivered_at': delivery_time}
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Increment streaks for Customer and Rider
         customer_id = order.get('user_id')
@@ -195,6 +199,10 @@ class RiderStatusToggleView(APIView):
         # Keep User model in sync for now to avoid breaking other views
         request.user.is_online = is_online
         request.user.save(update_fields=['is_online'])
+
+        if not is_online:
+            # Pings are only persisted periodically; keep the last position
+            rider_location_store.persist(request.user.id)
         
         return Response({
             'message': f"Rider is now {'online' if is_online else 'offline'}",
@@ -206,29 +214,66 @@ class AdminRiderListView(APIView):
     """List all riders and their status for admin."""
     permission_classes = [IsAdmin]
 
-    def get(self, request):
-        riders = User.objects.filter(role='RIDER').prefetch_related('rider_profile')
-        
+    active_statuses = ['ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'READY']
+    delivery_window_days = 7
+
+    def get_rider_metrics(self, rider_ids):
+        """
+        Per-rider dispatch metrics in one aggregation keyed on assigned_rider_id:
+        active tasks, deliveries since midnight (UTC) and the average
+        pickup-to-delivery time over the last `delivery_window_days`.
+        """
+        now = datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = min(today, now - timedelta(days=self.delivery_window_days))
+
+        is_delivered = {'$eq': ['$status', 'DELIVERED']}
+        pipeline = [
+            {'$match': {
+                'assigned_rider_id': {'$in': rider_ids},
+                '$or': [
+                    {'status': {'$in': self.active_statuses}},
+                    {'status': 'DELIVERED', 'delivered_at': {'$gte': window_start}},
+                ]
+            }},
+            {'$group': {
+                '_id': '$assigned_rider_id',
+                'active_tasks': {'$sum': {'$cond': [{'$in': ['$status', self.active_statuses]}, 1, 0]}},
+                'delivered_today': {'$sum': {'$cond': [
+                    {'$and': [is_delivered, {'$gte': ['$delivered_at', today]}]}, 1, 0
+                ]}},
+                'avg_delivery_ms': {'$avg': {'$cond': [
+                    {'$and': [is_delivered, {'$gt': ['$picked_up_at', None]}]},
+                    {'$subtract': ['$delivered_at', '$picked_up_at']},
+                    None
+                ]}},
+            }}
+        ]
         collection = mongo_service.get_collection('orders')
+        return {row['_id']: row for row in collection.aggregate(pipeline)}
+
+    def get(self, request):
+        riders = list(User.objects.filter(role='RIDER').select_related('rider_profile'))
+        metrics = self.get_rider_metrics([str(rider.id) for rider in riders])
+
         riders_list = []
         for rider in riders:
             # Safely get profile status
             is_online = rider.rider_profile.is_online if hasattr(rider, 'rider_profile') else rider.is_online
+            rider_metrics = metrics.get(str(rider.id), {})
+            avg_delivery_ms = rider_metrics.get('avg_delivery_ms')
             
-            rider_data = {
+            riders_list.append({
                 'id': rider.id,
                 'username': rider.username,
                 'email': rider.email,
                 'is_online': is_online,
                 'custom_id': rider.custom_id,
                 'streak_count': rider.streak_count,
-            }
-            
-            rider_data['active_tasks'] = collection.count_documents({
-                'assigned_rider_id': str(rider.id),
-                'status': {'$in': ['ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'READY']}
+                'active_tasks': rider_metrics.get('active_tasks', 0),
+                'delivered_today': rider_metrics.get('delivered_today', 0),
+                'avg_delivery_minutes': round(avg_delivery_ms / 60000, 1) if avg_delivery_ms is not None else None,
             })
-            riders_list.append(rider_data)
             
         return Response(riders_list)
 
@@ -246,32 +291,13 @@ class AdminAssignTaskView(APIView):
         if not rider:
             return Response({'error': 'Valid rider required'}, status=status.HTTP_404_NOT_FOUND)
             
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
-        
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-        update_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'assigned_rider_id': str(rider_id),
-                    'assigned_rider_name': rider.username,
-                    'status': 'ASSIGNED', # Initial state for rider
-                    'updated_at': update_time
-                },
-                '$push': {
-                    'status_history': {
-                        'status': 'ASSIGNED',
-                        'timestamp': update_time,
-                        'by': str(request.user.id),
-                        'note': f"Assigned to {rider.username}"
-                    }
-                }
-            }
-        )
+        try:
+            order = transition(
+                order_id, 'ASSIGNED', by=request.user.id, note=f"Assigned to {rider.username}",
+                set_fields={'assigned_rider_id': str(rider.id), 'assigned_rider_name': rider.username}
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Notify customer and rider
         customer = User.objects.filter(id=order.get('user_id')).first()
@@ -285,32 +311,10 @@ class RiderAcceptTaskView(APIView):
     permission_classes = [IsRider]
 
     def post(self, request, order_id):
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id, 'assigned_rider_id': str(request.user.id)})
-        
-        if not order:
-            return Response({'error': 'Order not found or not assigned to you'}, status=status.HTTP_404_NOT_FOUND)
-            
-        if order['status'] != 'ASSIGNED':
-            return Response({'error': 'Task already accepted or in progress'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        update_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'status': 'ACCEPTED',
-                    'updated_at': update_time
-                },
-                '$push': {
-                    'status_history': {
-                        'status': 'ACCEPTED',
-                        'timestamp': update_time,
-                        'by': str(request.user.id)
-                    }
-                }
-            }
-        )
+        try:
+            transition(order_id, 'ACCEPTED', by=request.user.id, rider_id=request.user.id, allowed=['ASSIGNED'])
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
         
         return Response({'message': 'Task accepted', 'status': 'ACCEPTED'})
 
@@ -342,23 +346,39 @@ class AdminRiderRegistrationView(APIView):
 
 
 class RiderLocationUpdateView(APIView):
-    """Update rider's current location."""
+    """
+    Record rider location pings, sent as {"pings": [...]} or a single {"location": ...}.
+
+    See services/rider_locations.py for how pings are stored.
+    """
     permission_classes = [IsRider]
 
+    def get_pings(self, data):
+        pings = data.get('pings')
+        if pings is None:
+            location = data.get('location')
+            if not location:
+                raise InvalidPing('Location required')
+            return normalize_location(location)
+        if not isinstance(pings, list) or not pings:
+            raise InvalidPing('Location required')
+
+        max_batch = getattr(settings, 'LOCATION_MAX_BATCH', 100)
+        if len(pings) > max_batch:
+            raise InvalidPing(f"At most {max_batch} pings can be sent at once")
+        return normalize_pings(pings)
+
     def post(self, request):
-        location = request.data.get('location')
-        if not location:
-            return Response({'error': 'Location required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        profile = request.user.rider_profile
-        profile.current_location = location
-        profile.save(update_fields=['current_location'])
-        
-        # Sync to User for now
-        request.user.location = location
-        request.user.save(update_fields=['location'])
+        try:
+            pings = self.get_pings(request.data)
+        except InvalidPing as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = rider_location_store.ingest(request.user.id, pings)
 
         return Response({
             'message': 'Location updated',
-            'location': location
+            'accepted': len(pings),
+            'location': result['latest']['location'],
+            'recorded_at': result['latest']['recorded_at'],
         })
@@ -5,10 +5,12 @@ Handles admin operations:
 - View all orders
 - Accept/reject orders
 - Assign riders to orders
-- Update order status (CLEANING, READY)
+- Update order status (CLEANING, READY), one order or in bulk
 - Send notifications
 """
+import logging
 from datetime import datetime
+from pymongo import UpdateOne
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -17,24 +19,49 @@ from django.contrib.auth import get_user_model
 from users.permissions import IsAdmin, IsSuperAdmin
 from services.mongo_service import mongo_service
 from services.notification_service import notification_service
+from services.pagination import MongoCursorPaginator, InvalidCursor
+from services import stats_service
+from services import rider_stats
+from services.stats_service import IN_PROGRESS_STATUSES, ORDER_STATUSES
+from services.catalog_cache import catalog_cache
+from services.order_events import order_event_bus
+from services.rider_locations import rider_location_store
+from orders import projections
+from orders.state_machine import allowed_from, assign_rider, can_transition, transition, TransitionError
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class AdminOrderListView(APIView):
     """Get all orders for admin management."""
     permission_classes = [IsAdmin]
+    allow_field_selection = True
 
     def get(self, request):
         collection = mongo_service.get_collection('orders')
         
-        # Filter by status if provided
-        status_filter = request.query_params.get('status')
+        # Filter by status (comma-separated), customer and/or missing rider if provided.
+        # Filtering happens here rather than in the browser so it is not limited to one page.
+        status_filter = [s for s in request.query_params.get('status', '').split(',') if s]
+        user_filter = request.query_params.get('user_id')
         query = {}
         if status_filter:
-            query['status'] = status_filter
+            query['status'] = status_filter[0] if len(status_filter) == 1 else {'$in': status_filter}
+        if user_filter:
+            query['user_id'] = user_filter
+        if request.query_params.get('unassigned') in ('1', 'true'):
+            # Orders the dispatch board can still hand to a rider (see AdminAssignTaskView)
+            query['assigned_rider_id'] = None
+            if not status_filter:
+                query['status'] = {'$in': [s for s in allowed_from('ASSIGNED') if s != 'ASSIGNED']}
         
-        orders = list(collection.find(query).sort('created_at', -1))
+        try:
+            orders, next_cursor = MongoCursorPaginator().paginate(
+                collection, query, request, projection=projections.SUMMARY
+            )
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Get all unique user IDs to fetch profile pictures in one batch
         user_ids = list(set(order.get('user_id') for order in orders if order.get('user_id')))
@@ -42,16 +69,10 @@ class AdminOrderListView(APIView):
                          for u in User.objects.filter(id__in=user_ids)}
 
         for order in orders:
-            order['_id'] = str(order['_id'])
             user_id = str(order.get('user_id'))
             order['customer_profile_picture'] = user_profiles.get(user_id)
-            
-            if isinstance(order.get('created_at'), datetime):
-                order['created_at'] = order['created_at'].isoformat()
-            if isinstance(order.get('updated_at'), datetime):
-                order['updated_at'] = order['updated_at'].isoformat()
 
-        return Response(orders)
+        return Response({'results': orders, 'next': next_cursor})
 
 
 class AcceptOrderView(APIView):
@@ -59,24 +80,12 @@ class AcceptOrderView(APIView):
     permission_classes = [IsAdmin]
 
     def post(self, request, order_id):
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
-
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        if order['status'] != 'PENDING':
-            return Response({'error': f"Cannot accept order with status: {order['status']}"}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-
         rider_id = request.data.get('rider_id')
         update_time = datetime.utcnow()
         
         update_data = {
-            'status': 'ACCEPTED',
             'accepted_by': str(request.user.id),
             'accepted_at': update_time,
-            'updated_at': update_time,
         }
         
         if rider_id:
@@ -88,20 +97,13 @@ class AcceptOrderView(APIView):
             except User.DoesNotExist:
                 return Response({'error': 'Invalid rider ID'}, status=status.HTTP_400_BAD_REQUEST)
 
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': update_data,
-                '$push': {
-                    'status_history': {
-                        'status': 'ACCEPTED',
-                        'timestamp': update_time,
-                        'by': str(request.user.id),
-                        'note': request.data.get('note', '')
-                    }
-                }
-            }
-        )
+        try:
+            order = transition(
+                order_id, 'ACCEPTED', by=request.user.id, note=request.data.get('note', ''),
+                allowed=['PENDING'], set_fields=update_data
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Notify customer (and rider if assigned)
         customer = User.objects.filter(id=order.get('user_id')).first()
@@ -131,29 +133,18 @@ class AssignRiderView(APIView):
         if not rider_id:
             return Response({'error': 'rider_id is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
-
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-
         # Verify rider exists
         try:
             rider = User.objects.get(id=rider_id, role='RIDER')
         except User.DoesNotExist:
             return Response({'error': 'Invalid rider ID'}, status=status.HTTP_400_BAD_REQUEST)
 
-        update_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'assigned_rider_id': str(rider.id),
-                    'assigned_rider_name': f"{rider.first_name} {rider.last_name}".strip() or rider.username,
-                    'updated_at': update_time,
-                }
-            }
-        )
+        try:
+            order = assign_rider(
+                order_id, rider.id, f"{rider.first_name} {rider.last_name}".strip() or rider.username
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Notify customer and rider
         customer = User.objects.filter(id=order.get('user_id')).first()
@@ -181,30 +172,16 @@ class UpdateOrderStatusView(APIView):
                 'error': f"Invalid status. Valid options: {self.VALID_STATUSES}"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        collection = mongo_service.get_collection('orders')
-        order = collection.find_one({'order_id': order_id})
-
-        if not order:
-            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        update_time = datetime.utcnow()
-        collection.update_one(
-            {'order_id': order_id},
-            {
-                '$set': {
-                    'status': new_status,
-                    'updated_at': update_time,
-                },
-                '$push': {
-                    'status_history': {
-                        'status': new_status,
-                        'timestamp': update_time,
-                        'by': str(request.user.id),
-                        'note': request.data.get('note', '')
-                    }
-                }
-            }
-        )
+        # Admins may override the normal flow, but never re-apply the current
+        # status. Commissions are keyed on order_id, so an order that leaves
+        # DELIVERED and is delivered again is still commissioned only once
+        try:
+            order = transition(
+                order_id, new_status, by=request.user.id, note=request.data.get('note', ''),
+                allowed=[current for current in ORDER_STATUSES if current != new_status]
+            )
+        except TransitionError as e:
+            return Response({'error': str(e)}, status=e.status_code)
 
         # Handle Commission if DELIVERED
         if new_status == 'DELIVERED':
@@ -217,18 +194,25 @@ class UpdateOrderStatusView(APIView):
                         commission_amount = float(order.get('total_price', 0)) * 0.05
                         
                         if commission_amount > 0:
+                            # One commission per order (unique index on order_id): an order
+                            # moved back out of DELIVERED and delivered again is not paid twice
                             commissions_collection = mongo_service.get_collection('commissions')
-                            commissions_collection.insert_one({
-                                'ambassador_id': str(ambassador.id),
-                                'ambassador_name': ambassador.username,
-                                'customer_id': str(customer.id),
-                                'customer_name': customer.username,
-                                'order_id': order_id,
-                                'order_amount': order.get('total_price', 0),
-                                'commission_amount': commission_amount,
-                                'created_at': datetime.utcnow()
-                            })
-                            print(f"💰 Commission of {commission_amount} credited to ambassador {ambassador.username}")
+                            result = commissions_collection.update_one(
+                                {'order_id': order_id},
+                                {'$setOnInsert': {
+                                    'ambassador_id': str(ambassador.id),
+                                    'ambassador_name': ambassador.username,
+                                    'customer_id': str(customer.id),
+                                    'customer_name': customer.username,
+                                    'order_id': order_id,
+                                    'order_amount': order.get('total_price', 0),
+                                    'commission_amount': commission_amount,
+                                    'created_at': datetime.utcnow()
+                                }},
+                                upsert=True
+                            )
+                            if result.upserted_id is not None:
+                                logger.info(f"Commission of {commission_amount} credited to ambassador {ambassador.username}")
                 except User.DoesNotExist:
                     pass
 
@@ -244,16 +228,133 @@ class UpdateOrderStatusView(APIView):
         })
 
 
+class BulkUpdateOrderStatusView(APIView):
+    """Admin moves many orders to CLEANING, READY or CANCELLED in one request."""
+    permission_classes = [IsAdmin]
+
+    BULK_STATUSES = ['CLEANING', 'READY', 'CANCELLED']
+    MAX_ORDERS = 500
+
+    def post(self, request):
+        new_status = request.data.get('status')
+        order_ids = request.data.get('order_ids')
+
+        if new_status not in self.BULK_STATUSES:
+            return Response({
+                'error': f"Invalid status. Valid options: {self.BULK_STATUSES}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(order_ids, list) or not order_ids:
+            return Response({'error': 'order_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+        if len(order_ids) > self.MAX_ORDERS:
+            return Response({
+                'error': f"At most {self.MAX_ORDERS} orders can be updated at once"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        collection = mongo_service.get_collection('orders')
+        orders = {
+            order['order_id']: order
+            for order in collection.find(
+                {'order_id': {'$in': order_ids}},
+                {'order_id': 1, 'status': 1, 'user_id': 1, 'total_price': 1, 'assigned_rider_id': 1}
+            )
+        }
+
+        # Validate every transition before writing anything
+        skipped = []
+        eligible = []
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if not order:
+                skipped.append({'order_id': order_id, 'error': 'Order not found'})
+            elif not can_transition(order.get('status'), new_status):
+                skipped.append({
+                    'order_id': order_id,
+                    'error': f"Cannot move order with status {order.get('status')} to {new_status}"
+                })
+            else:
+                eligible.append(order)
+
+        updated = []
+        if eligible:
+            update_time = datetime.utcnow()
+            history_entry = {
+                'status': new_status,
+                'timestamp': update_time,
+                'by': str(request.user.id),
+                'note': request.data.get('note', '')
+            }
+            # Status is part of each filter so an order changed since the read above is left alone
+            result = collection.bulk_write([
+                UpdateOne(
+                    {'order_id': order['order_id'], 'status': order['status']},
+                    {
+                        '$set': {'status': new_status, 'updated_at': update_time},
+                        '$push': {'status_history': history_entry}
+                    }
+                )
+                for order in eligible
+            ], ordered=False)
+
+            if result.modified_count == len(eligible):
+                updated = eligible
+            else:
+                changed = {
+                    doc['order_id']
+                    for doc in collection.find(
+                        {'order_id': {'$in': [o['order_id'] for o in eligible]}, 'status': {'$ne': new_status}},
+                        {'order_id': 1}
+                    )
+                }
+                for order in eligible:
+                    if order['order_id'] in changed:
+                        skipped.append({'order_id': order['order_id'], 'error': 'Order was modified concurrently'})
+                    else:
+                        updated.append(order)
+
+        if updated:
+            stats_service.record_status_changes(
+                (order['status'], new_status, order.get('total_price')) for order in updated
+            )
+            rider_stats.invalidate(*{order.get('assigned_rider_id') for order in updated})
+            for order in updated:
+                order_event_bus.publish_transition(
+                    {**order, 'status': new_status, 'updated_at': update_time}, order['status']
+                )
+
+            customer_ids = {order.get('user_id') for order in updated if order.get('user_id')}
+            customers = {str(user.id): user for user in User.objects.filter(id__in=customer_ids)}
+            notification_service.notify_order_statuses(
+                (customers[order['user_id']], order['order_id'], new_status)
+                for order in updated
+                if order.get('user_id') in customers
+            )
+
+        return Response({
+            'message': f'{len(updated)} orders updated to {new_status}',
+            'status': new_status,
+            'updated': [order['order_id'] for order in updated],
+            'skipped': skipped
+        })
+
+
 class AvailableRidersView(APIView):
     """Get list of available riders for assignment."""
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        riders = User.objects.filter(role='RIDER').values(
+        riders = list(User.objects.filter(role='RIDER').values(
             'id', 'username', 'first_name', 'last_name', 
             'phone_number', 'location', 'is_active'
-        )
-        return Response(list(riders))
+        ))
+        # Postgres lags behind the riders' pings; the hot store has their latest position
+        latest = rider_location_store.get_latest([rider['id'] for rider in riders]) if riders else {}
+        for rider in riders:
+            if str(rider['id']) in latest:
+                rider['location'] = latest[str(rider['id'])]['location']
+        return Response(riders)
 
 
 class AdminStatsView(APIView):
@@ -261,31 +362,21 @@ class AdminStatsView(APIView):
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        collection = mongo_service.get_collection('orders')
-        
-        # Calculate total revenue
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_revenue": {"$sum": "$total_price"}
-                }
-            }
-        ]
-        revenue_result = list(collection.aggregate(pipeline))
-        total_revenue = revenue_result[0]['total_revenue'] if revenue_result else 0
-        
+        order_stats = stats_service.get_dashboard_counters()
+        role_counts = stats_service.get_user_role_counts()
+        by_status = order_stats['by_status']
+
         stats = {
-            'total_orders': collection.count_documents({}),
-            'pending': collection.count_documents({'status': 'PENDING'}),
-            'in_progress': collection.count_documents({'status': {'$in': ['ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'CLEANING', 'READY']}}),
-            'delivered': collection.count_documents({'status': 'DELIVERED'}),
-            'total_revenue': total_revenue,
-            'total_riders': User.objects.filter(role='RIDER').count(),
-            'total_customers': User.objects.filter(role='CUSTOMER').count(),
-            'total_ambassadors': User.objects.filter(role='AMBASSADOR').count(),
-            'reviews': mongo_service.get_collection('reviews').count_documents({}),
-            'complaints': mongo_service.get_collection('complaints').count_documents({}),
+            'total_orders': order_stats['total_orders'],
+            'pending': by_status['PENDING'],
+            'in_progress': sum(by_status[s] for s in IN_PROGRESS_STATUSES),
+            'delivered': by_status['DELIVERED'],
+            'total_revenue': order_stats['total_revenue'],
+            'total_riders': role_counts['RIDER'],
+            'total_customers': role_counts['CUSTOMER'],
+            'total_ambassadors': role_counts['AMBASSADOR'],
+            'reviews': order_stats['reviews'],
+            'complaints': order_stats['complaints'],
         }
         
         return Response(stats)
@@ -298,8 +389,6 @@ class AdminCatalogManageView(APIView):
         """Get full catalog for management."""
         collection = mongo_service.get_collection('catalog')
         items = list(collection.find().sort('category', 1))
-        for item in items:
-            item['_id'] = str(item['_id'])
         return Response(items)
 
     def post(self, request):
@@ -323,8 +412,8 @@ class AdminCatalogManageView(APIView):
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        result = collection.insert_one(item)
-        item['_id'] = str(result.inserted_id)
+        collection.insert_one(item)
+        catalog_cache.invalidate()
         return Response(item, status=status.HTTP_201_CREATED)
 
 class AdminCatalogUpdateView(APIView):
@@ -346,6 +435,7 @@ class AdminCatalogUpdateView(APIView):
         result = collection.update_one({'name': item_name}, {'$set': update_data})
         if result.matched_count == 0:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        catalog_cache.invalidate()
             
         return Response({'message': f'Item {item_name} updated successfully'})
 
@@ -355,5 +445,6 @@ class AdminCatalogUpdateView(APIView):
         result = collection.delete_one({'name': item_name})
         if result.deleted_count == 0:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        catalog_cache.invalidate()
             
         return Response({'message': f'Item {item_name} deleted successfully'})
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.mongo_service import mongo_service
+from services.mongo_indexes import ensure_collections, ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Creates any missing MongoDB indexes declared in services/mongo_indexes.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report missing/unused indexes without creating anything',
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Exit with an error if any index could not be created',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        try:
+            db = mongo_service.db
+        except Exception as e:
+            raise CommandError(str(e))
+
+        for collection_name in ensure_collections(db, dry_run=dry_run):
+            if dry_run:
+                self.stdout.write(self.style.WARNING(f'{collection_name}: collection missing'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{collection_name}: created collection'))
+
+        results = ensure_indexes(db, dry_run=dry_run)
+
+        has_errors = False
+        for collection_name, report in results.items():
+            self.stdout.write(f'{collection_name}:')
+
+            for name in report['created']:
+                self.stdout.write(self.style.SUCCESS(f'  created {name}'))
+            if dry_run:
+                for name in report['missing']:
+                    self.stdout.write(self.style.WARNING(f'  missing {name}'))
+            if not report['missing']:
+                self.stdout.write('  all declared indexes present')
+
+            for name in report['unmanaged']:
+                self.stdout.write(self.style.WARNING(f'  unmanaged {name} (not declared in the registry)'))
+            if report['unused'] is None:
+                self.stdout.write('  index usage stats unavailable')
+            else:
+                for name in report['unused']:
+                    self.stdout.write(self.style.WARNING(f'  unused {name} (no accesses since server start)'))
+
+            for error in report['errors']:
+                has_errors = True
+                self.stdout.write(self.style.ERROR(f'  error {error}'))
+
+        if has_errors and options['strict']:
+            raise CommandError('Some indexes could not be created. See errors above.')
+
+        self.stdout.write(self.style.SUCCESS('MongoDB indexes are up to date.' if not dry_run else 'Dry run complete.'))
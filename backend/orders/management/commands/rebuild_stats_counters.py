@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from services import stats_service
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized dashboard counters (stats_counters) from the source collections'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding stats counters...')
+
+        try:
+            counters = stats_service.rebuild_counters()
+        except Exception as e:
+            raise CommandError(f'Failed to rebuild stats counters: {e}')
+
+        self.stdout.write(f"Orders: {counters['orders']['total']}")
+        self.stdout.write(f"Revenue: {counters['revenue']['total']} (delivered: {counters['revenue']['delivered']})")
+        self.stdout.write(f"Reviews: {counters['reviews']}, Complaints: {counters['complaints']}")
+        self.stdout.write(self.style.SUCCESS('Stats counters rebuilt successfully!'))
@@ -0,0 +1,42 @@
+"""
+Order Projection Profiles
+
+List endpoints ask MongoDB only for the fields their screens display, so the
+unbounded `status_history` array and per-item notes/prices stay on the server:
+- SUMMARY: customer history and admin order lists
+- RIDER: rider task board, rider history and delta sync
+- Single-order views read the full document
+"""
+
+SUMMARY = {
+    'order_id': 1,
+    'user_id': 1,
+    'customer_name': 1,
+    'status': 1,
+    'total_price': 1,
+    'items.name': 1,
+    'items.quantity': 1,
+    'items.color': 1,
+    'pickup_location': 1,
+    'delivery_location': 1,
+    'phone_number': 1,
+    'assigned_rider_id': 1,
+    'assigned_rider_name': 1,
+    'is_reviewed': 1,
+    'created_at': 1,
+    'updated_at': 1,
+}
+
+RIDER = {
+    'order_id': 1,
+    'user_id': 1,
+    'customer_name': 1,
+    'phone_number': 1,
+    'status': 1,
+    'total_price': 1,
+    'pickup_location': 1,
+    'delivery_location': 1,
+    'assigned_rider_id': 1,
+    'created_at': 1,
+    'updated_at': 1,
+}
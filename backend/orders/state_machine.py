@@ -0,0 +1,147 @@
+"""
+Order State Machine
+
+Single source of truth for order status transitions:
+- ALLOWED_TRANSITIONS maps a target status to the statuses it may be entered from
+- can_transition() checks one move
+- transition() applies one move as a single atomic find_one_and_update whose
+  filter includes the allowed prior statuses, so concurrent rider/admin
+  actions cannot both win (no double deliveries or commissions)
+- assign_rider() changes the rider of an open order without moving its status
+- Riders an order is taken away from are recorded in `unassigned_rider_ids`,
+  so their delta sync can drop it
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from rest_framework import status
+from services.mongo_service import mongo_service
+from services import stats_service
+from services import rider_stats
+from services.order_events import order_event_bus
+
+ALLOWED_TRANSITIONS = {
+    'ACCEPTED': ['PENDING', 'ASSIGNED'],
+    'ASSIGNED': ['PENDING', 'ACCEPTED', 'ASSIGNED'],
+    'PICKED_UP': ['ASSIGNED', 'ACCEPTED'],
+    'CLEANING': ['PICKED_UP'],
+    'READY': ['CLEANING'],
+    'DELIVERED': ['READY'],
+    'CANCELLED': ['PENDING', 'ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'CLEANING', 'READY'],
+}
+
+# Statuses whose rider can still be changed
+OPEN_STATUSES = ['PENDING', 'ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'CLEANING', 'READY']
+
+
+def allowed_from(new_status):
+    """Statuses an order may be in to move to `new_status`."""
+    return ALLOWED_TRANSITIONS.get(new_status, [])
+
+
+def can_transition(old_status, new_status):
+    return old_status in allowed_from(new_status)
+
+
+def _record_unassignment(collection, before, fields):
+    """Tombstone the previous rider if `fields` took the order away from them."""
+    previous_rider_id = before.get('assigned_rider_id')
+    if 'assigned_rider_id' not in fields or not previous_rider_id:
+        return
+    if str(previous_rider_id) == str(fields['assigned_rider_id']):
+        return
+    collection.update_one(
+        {'_id': before['_id']},
+        {'$addToSet': {'unassigned_rider_ids': str(previous_rider_id)}}
+    )
+
+
+class TransitionError(Exception):
+    """Raised when a transition cannot be applied. Carries the HTTP status to return."""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _explain_failure(collection, order_id, rider_id, message):
+    """Only failed updates pay for a second read, to say why they failed."""
+    order = collection.find_one({'order_id': order_id}, {'status': 1, 'assigned_rider_id': 1})
+    if not order:
+        raise TransitionError('Order not found', status.HTTP_404_NOT_FOUND)
+    if rider_id is not None and order.get('assigned_rider_id') != str(rider_id):
+        raise TransitionError('Not your assigned order', status.HTTP_403_FORBIDDEN)
+    raise TransitionError(message.format(status=order.get('status')))
+
+
+def transition(order_id, new_status, by, note='', rider_id=None, allowed=None, set_fields=None):
+    """
+    Move an order to `new_status` in one round trip and return the updated order.
+
+    Args:
+        order_id: Order to move
+        new_status: Target status
+        by: ID of the user making the change (recorded in status_history)
+        note: Optional status_history note
+        rider_id: If given, the order must be assigned to this rider
+        allowed: Prior statuses to accept instead of ALLOWED_TRANSITIONS
+        set_fields: Extra fields to $set alongside the status
+
+    Raises TransitionError if the order does not exist, belongs to another
+    rider, or is not in an allowed prior status.
+    """
+    now = datetime.utcnow()
+    query = {'order_id': order_id, 'status': {'$in': list(allowed if allowed is not None else allowed_from(new_status))}}
+    if rider_id is not None:
+        query['assigned_rider_id'] = str(rider_id)
+
+    fields = {'status': new_status, 'updated_at': now, **(set_fields or {})}
+    history_entry = {'status': new_status, 'timestamp': now, 'by': str(by), 'note': note or ''}
+
+    collection = mongo_service.get_collection('orders')
+    before = collection.find_one_and_update(
+        query,
+        {'$set': fields, '$push': {'status_history': history_entry}},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if before is None:
+        _explain_failure(collection, order_id, rider_id, f"Cannot move order with status {{status}} to {new_status}")
+
+    _record_unassignment(collection, before, fields)
+    stats_service.record_status_change(before.get('status'), new_status, before.get('total_price'))
+    rider_stats.invalidate(before.get('assigned_rider_id'), fields.get('assigned_rider_id'))
+
+    order = {
+        **before,
+        **fields,
+        'status_history': before.get('status_history', []) + [history_entry],
+    }
+    order_event_bus.publish_transition(order, before.get('status'))
+    return order
+
+
+def assign_rider(order_id, rider_id, rider_name):
+    """
+    Give an open order to another rider without changing its status.
+
+    Returns the updated order. Raises TransitionError if the order does not
+    exist or is already delivered or cancelled.
+    """
+    now = datetime.utcnow()
+    fields = {'assigned_rider_id': str(rider_id), 'assigned_rider_name': rider_name, 'updated_at': now}
+
+    collection = mongo_service.get_collection('orders')
+    before = collection.find_one_and_update(
+        {'order_id': order_id, 'status': {'$in': OPEN_STATUSES}},
+        {'$set': fields},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        _explain_failure(collection, order_id, None, "Cannot assign a rider to an order with status {status}")
+
+    _record_unassignment(collection, before, fields)
+    rider_stats.invalidate(before.get('assigned_rider_id'), rider_id)
+
+    order = {**before, **fields}
+    order_event_bus.publish_transition(order, before.get('status'))
+    return order
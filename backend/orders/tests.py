@@ -1,3 +1,504 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+from core.events import order_events_app
+from orders.state_machine import TransitionError, transition
+from services import stats_service
+from services.idempotency import IdempotencyConflict, IdempotencyMismatch, idempotency_store
+from services.mongo_service import mongo_service
+from services.order_events import TICKET_PURPOSE, event_from_change
+from services.stream_tickets import stream_ticket_store
+from services.testing import MongoTestCase
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+def make_user(username, role='CUSTOMER', **fields):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **fields
+    )
+
+
+def make_order(order_id, status='PENDING', total_price=100, **fields):
+    now = datetime.utcnow()
+    return {
+        'order_id': order_id,
+        'user_id': '1',
+        'status': status,
+        'total_price': total_price,
+        'status_history': [],
+        'created_at': now,
+        'updated_at': now,
+        **fields,
+    }
+
+
+class StatsCountersTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = mongo_service.get_collection('orders')
+        delivered_at = datetime.utcnow() - timedelta(days=3)
+        self.orders.insert_many([
+            make_order(f'OLD-{i}', status='DELIVERED', delivered_at=delivered_at, created_at=delivered_at)
+            for i in range(50)
+        ])
+
+    def test_first_write_after_deploy_does_not_hide_existing_orders(self):
+        # Counters were never built, then one new order arrives
+        order = make_order('NEW-1')
+        self.orders.insert_one(order)
+        stats_service.record_order_created(order)
+
+        counters = stats_service.get_dashboard_counters()
+
+        self.assertEqual(counters['total_orders'], 51)
+        self.assertEqual(counters['by_status']['DELIVERED'], 50)
+        self.assertEqual(counters['by_status']['PENDING'], 1)
+        self.assertEqual(counters['delivered_revenue'], 5000)
+
+    def test_moving_existing_orders_never_goes_negative(self):
+        self.orders.update_one({'order_id': 'OLD-0'}, {'$set': {'status': 'CANCELLED'}})
+        stats_service.record_status_change('DELIVERED', 'CANCELLED', 100)
+
+        counters = stats_service.get_dashboard_counters()
+
+        self.assertEqual(counters['by_status']['DELIVERED'], 49)
+        self.assertEqual(counters['by_status']['CANCELLED'], 1)
+        self.assertEqual(counters['delivered_revenue'], 4900)
+
+    def test_increments_apply_once_bootstrapped(self):
+        stats_service.get_dashboard_counters()
+
+        order = make_order('NEW-1')
+        self.orders.insert_one(order)
+        stats_service.record_order_created(order)
+        stats_service.record_status_change('PENDING', 'ACCEPTED', 100)
+
+        counters = stats_service.get_dashboard_counters()
+
+        self.assertEqual(counters['total_orders'], 51)
+        self.assertEqual(counters['by_status']['PENDING'], 0)
+        self.assertEqual(counters['by_status']['ACCEPTED'], 1)
+
+
+class DashboardStatsTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        orders = mongo_service.get_collection('orders')
+        orders.insert_many([
+            make_order('O-1', status='PENDING', total_price=10),
+            make_order('O-2', status='PICKED_UP', total_price=20),
+            make_order('O-3', status='DELIVERED', total_price=30),
+            make_order('O-4', status='DELIVERED', total_price=40),
+        ])
+        mongo_service.get_collection('reviews').insert_one({'order_id': 'O-3', 'rating': 5})
+        mongo_service.get_collection('complaints').insert_many([{'subject': 'a'}, {'subject': 'b'}])
+
+    def test_order_stats_in_one_aggregation(self):
+        stats = stats_service.get_order_stats()
+
+        self.assertEqual(stats['total_orders'], 4)
+        self.assertEqual(stats['by_status']['DELIVERED'], 2)
+        self.assertEqual(stats['by_status']['CANCELLED'], 0)
+        self.assertEqual(stats['total_revenue'], 100)
+        self.assertEqual(stats['delivered_revenue'], 70)
+        self.assertEqual(stats['reviews'], 1)
+        self.assertEqual(stats['complaints'], 2)
+
+    def test_user_role_counts_in_one_query(self):
+        make_user('rider1', role='RIDER')
+        make_user('customer1')
+        make_user('customer2')
+
+        with self.assertNumQueries(1):
+            counts = stats_service.get_user_role_counts()
+
+        self.assertEqual(counts['RIDER'], 1)
+        self.assertEqual(counts['CUSTOMER'], 2)
+        self.assertEqual(counts['SUPER_ADMIN'], 0)
+
+    def test_admin_stats_view(self):
+        make_user('rider1', role='RIDER')
+        client = APIClient()
+        client.force_authenticate(make_user('admin1', role='ADMIN'))
+
+        response = client.get('/api/orders/admin/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_orders'], 4)
+        self.assertEqual(response.data['pending'], 1)
+        self.assertEqual(response.data['in_progress'], 1)
+        self.assertEqual(response.data['delivered'], 2)
+        self.assertEqual(response.data['total_riders'], 1)
+        self.assertEqual(response.data['complaints'], 2)
+
+
+class OrderStateMachineTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = mongo_service.get_collection('orders')
+        self.admin = make_user('admin', role='ADMIN')
+        self.rider = make_user('rider', role='RIDER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_order(self, order_id, status, **fields):
+        self.orders.insert_one(make_order(order_id, status=status, **fields))
+
+    def get_order(self, order_id):
+        return self.orders.find_one({'order_id': order_id})
+
+    def test_transition_applies_allowed_move(self):
+        self.add_order('O-1', 'PENDING')
+
+        order = transition('O-1', 'ACCEPTED', by=self.admin.id, note='ok')
+
+        self.assertEqual(order['status'], 'ACCEPTED')
+        stored = self.get_order('O-1')
+        self.assertEqual(stored['status'], 'ACCEPTED')
+        self.assertEqual(stored['status_history'][-1]['status'], 'ACCEPTED')
+        self.assertEqual(stored['status_history'][-1]['note'], 'ok')
+
+    def test_transition_rejects_disallowed_move(self):
+        self.add_order('O-1', 'PENDING')
+
+        with self.assertRaises(TransitionError) as raised:
+            transition('O-1', 'DELIVERED', by=self.admin.id)
+
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(self.get_order('O-1')['status'], 'PENDING')
+        self.assertEqual(self.get_order('O-1')['status_history'], [])
+
+    def test_transition_reports_missing_order_and_wrong_rider(self):
+        self.add_order('O-1', 'ASSIGNED', assigned_rider_id='999')
+
+        with self.assertRaises(TransitionError) as missing:
+            transition('O-404', 'ACCEPTED', by=self.rider.id)
+        with self.assertRaises(TransitionError) as not_yours:
+            transition('O-1', 'ACCEPTED', by=self.rider.id, rider_id=self.rider.id)
+
+        self.assertEqual(missing.exception.status_code, 404)
+        self.assertEqual(not_yours.exception.status_code, 403)
+
+    def test_order_is_delivered_only_once(self):
+        self.add_order('O-1', 'READY')
+
+        transition('O-1', 'DELIVERED', by=self.rider.id)
+        with self.assertRaises(TransitionError):
+            transition('O-1', 'DELIVERED', by=self.rider.id)
+
+        self.assertEqual(len(self.get_order('O-1')['status_history']), 1)
+
+    def test_dispatch_cannot_reopen_finished_orders(self):
+        for order_id, status in [('O-1', 'DELIVERED'), ('O-2', 'CANCELLED'), ('O-3', 'PICKED_UP')]:
+            self.add_order(order_id, status)
+
+            response = self.client.post(f'/api/logistics/admin/assign/{order_id}/', {'rider_id': self.rider.id})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.get_order(order_id)['status'], status)
+            self.assertNotIn('assigned_rider_id', self.get_order(order_id))
+
+    def test_dispatch_assigns_and_tombstones_previous_rider(self):
+        self.add_order('O-1', 'ACCEPTED', assigned_rider_id='999')
+
+        response = self.client.post('/api/logistics/admin/assign/O-1/', {'rider_id': self.rider.id})
+
+        self.assertEqual(response.status_code, 200)
+        order = self.get_order('O-1')
+        self.assertEqual(order['status'], 'ASSIGNED')
+        self.assertEqual(order['assigned_rider_id'], str(self.rider.id))
+        self.assertEqual(order['unassigned_rider_ids'], ['999'])
+
+    def test_assign_rider_keeps_status_of_open_orders_only(self):
+        self.add_order('O-1', 'READY')
+        self.add_order('O-2', 'DELIVERED')
+
+        ready = self.client.post('/api/orders/admin/assign/O-1/', {'rider_id': self.rider.id})
+        delivered = self.client.post('/api/orders/admin/assign/O-2/', {'rider_id': self.rider.id})
+
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(self.get_order('O-1')['status'], 'READY')
+        self.assertEqual(self.get_order('O-1')['assigned_rider_id'], str(self.rider.id))
+        self.assertEqual(delivered.status_code, 400)
+        self.assertNotIn('assigned_rider_id', self.get_order('O-2'))
+
+    def test_redelivery_does_not_pay_commission_twice(self):
+        ambassador = make_user('ambassador', role='AMBASSADOR')
+        customer = make_user('customer', referred_by=ambassador)
+        self.add_order('O-1', 'READY', user_id=str(customer.id), total_price=200)
+
+        for status in ['DELIVERED', 'READY', 'DELIVERED']:
+            response = self.client.post('/api/orders/admin/status/O-1/', {'status': status})
+            self.assertEqual(response.status_code, 200)
+
+        commissions = list(mongo_service.get_collection('commissions').find({'order_id': 'O-1'}))
+        self.assertEqual(len(commissions), 1)
+        self.assertEqual(commissions[0]['commission_amount'], 10.0)
+
+
+class IdempotencyKeyTests(MongoTestCase):
+    url = '/api/orders/'
+
+    def setUp(self):
+        super().setUp()
+        mongo_service.get_collection('catalog').insert_one(
+            {'name': 'Shirt', 'price': 10, 'category': 'Wear', 'is_active': True}
+        )
+        self.customer = make_user('customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        patcher = mock.patch('orders.views.notification_service.notify_order_placed')
+        self.notify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def place(self, key, quantity=2, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        return self.client.post(
+            self.url,
+            {'items': [{'name': 'Shirt', 'quantity': quantity}], 'location': 'Osu'},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def order_count(self):
+        return mongo_service.get_collection('orders').count_documents({})
+
+    def test_replay_returns_original_order(self):
+        first = self.place('key-1')
+        replay = self.place('key-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(replay.data['order_id'], first.data['order_id'])
+        self.assertEqual(replay.data['total_price'], 20)
+        self.assertEqual(self.order_count(), 1)
+        self.assertEqual(self.notify.call_count, 1)
+
+    def test_different_body_is_rejected(self):
+        self.place('key-1')
+        response = self.place('key-1', quantity=3)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.order_count(), 1)
+
+    def test_key_still_in_progress_is_a_conflict(self):
+        with mock.patch('orders.views.idempotency_store.begin', side_effect=IdempotencyConflict):
+            response = self.place('key-1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.order_count(), 0)
+
+    def test_keys_are_scoped_per_user(self):
+        first = self.place('key-1')
+        other = self.place('key-1', user=make_user('other'))
+
+        self.assertEqual(other.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertNotEqual(other.data['order_id'], first.data['order_id'])
+        self.assertEqual(self.order_count(), 2)
+
+    def test_failed_request_releases_key(self):
+        with mock.patch('orders.views.stats_service.record_order_created', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.place('key-1')
+
+        retry = self.place('key-1')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', retry)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post(self.url, {'items': [{'name': 'Shirt', 'quantity': 1}]}, format='json')
+        self.client.post(self.url, {'items': [{'name': 'Shirt', 'quantity': 1}]}, format='json')
+
+        self.assertEqual(self.order_count(), 2)
+
+
+class IdempotencyStoreTests(MongoTestCase):
+    def test_claim_conflicts_until_completed(self):
+        self.assertIsNone(idempotency_store.begin('orders:1', 'k', 'fp'))
+        with self.assertRaises(IdempotencyConflict):
+            idempotency_store.begin('orders:1', 'k', 'fp')
+        with self.assertRaises(IdempotencyMismatch):
+            idempotency_store.begin('orders:1', 'k', 'other-fp')
+
+        idempotency_store.complete('orders:1', 'k', {'order_id': 'O-1'})
+
+        record = idempotency_store.begin('orders:1', 'k', 'fp')
+        self.assertEqual(record['result'], {'order_id': 'O-1'})
+
+    def test_abandoned_claim_can_be_taken_over(self):
+        idempotency_store.begin('orders:1', 'k', 'fp')
+        idempotency_store.collection.update_one(
+            {'_id': 'orders:1:k'},
+            {'$set': {'locked_at': datetime.utcnow() - timedelta(seconds=idempotency_store.lock_timeout + 1)}}
+        )
+
+        self.assertIsNone(idempotency_store.begin('orders:1', 'k', 'fp'))
+        with self.assertRaises(IdempotencyConflict):
+            idempotency_store.begin('orders:1', 'k', 'fp')
+
+
+@override_settings(ORDER_EVENTS_CHANGE_STREAM=False)
+class OrderEventStreamAuthTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_user('customer')
+
+    def open_stream(self, query):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'query_string': query.encode(), 'headers': []}
+        async_to_sync(order_events_app)(scope, receive, send)
+        return sent[0]['status']
+
+    def test_ticket_view_requires_authentication(self):
+        response = APIClient().post('/api/orders/events/ticket/')
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_ticket_opens_the_stream_once(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.post('/api/orders/events/ticket/')
+        ticket = response.data['ticket']
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['url'], f'/api/events/orders/?ticket={ticket}')
+        self.assertEqual(self.open_stream(f'ticket={ticket}'), 200)
+        self.assertEqual(self.open_stream(f'ticket={ticket}'), 401)
+
+    def test_stream_rejects_missing_expired_and_foreign_tickets(self):
+        expired = stream_ticket_store.issue(self.customer.id, TICKET_PURPOSE)
+        stream_ticket_store.collection.update_one(
+            {'_id': expired}, {'$set': {'expires_at': datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        foreign = stream_ticket_store.issue(self.customer.id, 'other_stream')
+
+        self.assertEqual(self.open_stream(''), 401)
+        self.assertEqual(self.open_stream(f'ticket={expired}'), 401)
+        self.assertEqual(self.open_stream(f'ticket={foreign}'), 401)
+
+
+class OrderChangeStreamEventTests(SimpleTestCase):
+    def make_change(self, order, updated_fields):
+        return {'fullDocument': order, 'updateDescription': {'updatedFields': updated_fields}}
+
+    def test_previous_status_comes_from_pushed_history_entry(self):
+        order = make_order('O-1', status='PICKED_UP', status_history=[
+            {'status': 'ACCEPTED'}, {'status': 'ASSIGNED'}, {'status': 'PICKED_UP'},
+        ])
+
+        event, channels = event_from_change(self.make_change(order, {
+            'status': 'PICKED_UP', 'status_history.2': {'status': 'PICKED_UP'},
+        }))
+
+        self.assertEqual(event['status'], 'PICKED_UP')
+        self.assertEqual(event['previous_status'], 'ASSIGNED')
+        self.assertIn('user:1', channels)
+
+    def test_first_transition_starts_from_pending(self):
+        order = make_order('O-1', status='ACCEPTED', status_history=[{'status': 'ACCEPTED'}])
+
+        event, _ = event_from_change(self.make_change(order, {
+            'status': 'ACCEPTED', 'status_history': [{'status': 'ACCEPTED'}],
+        }))
+
+        self.assertEqual(event['previous_status'], 'PENDING')
+
+    def test_event_reflects_this_update_not_later_ones(self):
+        # Looked up after the order had already moved on
+        order = make_order('O-1', status='CLEANING', status_history=[
+            {'status': 'ACCEPTED'}, {'status': 'PICKED_UP'}, {'status': 'CLEANING'},
+        ])
+
+        event, _ = event_from_change(self.make_change(order, {
+            'status': 'PICKED_UP', 'status_history.1': {'status': 'PICKED_UP'},
+        }))
+
+        self.assertEqual(event['status'], 'PICKED_UP')
+        self.assertEqual(event['previous_status'], 'ACCEPTED')
+
+    def test_assignment_without_status_change_is_published(self):
+        order = make_order('O-1', status='READY', assigned_rider_id='7')
+
+        event, channels = event_from_change(self.make_change(order, {'assigned_rider_id': '7'}))
+
+        self.assertEqual(event['status'], 'READY')
+        self.assertEqual(event['previous_status'], 'READY')
+        self.assertEqual(event['assigned_rider_id'], '7')
+        self.assertIn('rider:7', channels)
+
+    def test_deleted_order_is_skipped(self):
+        self.assertIsNone(event_from_change(self.make_change(None, {'status': 'DELIVERED'})))
+
+
+class CustomerOrderListTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_user('customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        user_id = str(self.customer.id)
+        items = [{'name': 'Shirt', 'quantity': 1}]
+        mongo_service.get_collection('orders').insert_many([
+            make_order('O-1', status='PENDING', total_price=10, user_id=user_id, items=items),
+            make_order('O-2', status='DELIVERED', total_price=20, user_id=user_id, items=items * 2),
+            make_order('O-3', status='CANCELLED', total_price=30, user_id=user_id, items=items * 3),
+            make_order('O-4', status='DELIVERED', total_price=99, user_id='someone-else', items=items),
+        ])
+
+    def test_status_filter_spans_pages(self):
+        first = self.client.get('/api/orders/', {'status': 'DELIVERED,CANCELLED', 'page_size': 1})
+        second = self.client.get('/api/orders/', {'status': 'DELIVERED,CANCELLED', 'cursor': first.data['next']})
+
+        ids = [o['order_id'] for o in first.data['results'] + second.data['results']]
+        self.assertEqual(sorted(ids), ['O-2', 'O-3'])
+        self.assertIsNone(second.data['next'])
+
+    def test_summary_covers_whole_history(self):
+        response = self.client.get('/api/orders/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'orders': 3, 'items': 6, 'spent': 60})
+
+    def test_summary_without_orders(self):
+        self.client.force_authenticate(make_user('newcomer'))
+
+        response = self.client.get('/api/orders/summary/')
+
+        self.assertEqual(response.data, {'orders': 0, 'items': 0, 'spent': 0})
+
+
+class CatalogCacheIsolationTests(MongoTestCase):
+    # Whichever test runs second would see the first one's cached catalog if
+    # MongoTestCase did not reset the in-process caches
+
+    def assert_catalog_is(self, name):
+        mongo_service.get_collection('catalog').insert_one(
+            {'name': name, 'price': 10, 'category': 'Wear', 'is_active': True}
+        )
+
+        response = APIClient().get('/api/orders/catalog/')
+
+        self.assertEqual([item['name'] for item in response.data], [name])
+
+    def test_first_catalog(self):
+        self.assert_catalog_is('Shirt')
+
+    def test_second_catalog(self):
+        self.assert_catalog_is('Duvet')
@@ -1,10 +1,19 @@
 from django.urls import path
-from .views import OrderListCreateView, OrderDetailView, ReviewCreateView, PublicReviewListView, CatalogListView
+from .views import (
+    OrderListCreateView,
+    OrderSummaryView,
+    OrderDetailView,
+    ReviewCreateView,
+    PublicReviewListView,
+    CatalogListView,
+    OrderEventTicketView,
+)
 from .admin_views import (
     AdminOrderListView,
     AcceptOrderView,
     AssignRiderView,
     UpdateOrderStatusView,
+    BulkUpdateOrderStatusView,
     AvailableRidersView,
     AdminStatsView,
     AdminCatalogManageView,
@@ -14,15 +23,18 @@ from .admin_views import (
 urlpatterns = [
     # Customer endpoints
     path('', OrderListCreateView.as_view(), name='order_list_create'),
+    path('summary/', OrderSummaryView.as_view(), name='order_summary'),
     path('review/', ReviewCreateView.as_view(), name='order_review'),
     path('catalog/', CatalogListView.as_view(), name='catalog_list'),
     path('reviews/public/', PublicReviewListView.as_view(), name='public_reviews'),
+    path('events/ticket/', OrderEventTicketView.as_view(), name='order_event_ticket'),
     path('<str:order_id>/', OrderDetailView.as_view(), name='order_detail'),
     
     # Admin endpoints  
     path('admin/all/', AdminOrderListView.as_view(), name='admin_order_list'),
     path('admin/accept/<str:order_id>/', AcceptOrderView.as_view(), name='admin_accept_order'),
     path('admin/assign/<str:order_id>/', AssignRiderView.as_view(), name='admin_assign_rider'),
+    path('admin/status/bulk/', BulkUpdateOrderStatusView.as_view(), name='admin_bulk_update_status'),
     path('admin/status/<str:order_id>/', UpdateOrderStatusView.as_view(), name='admin_update_status'),
     path('admin/riders/', AvailableRidersView.as_view(), name='admin_available_riders'),
     path('admin/stats/', AdminStatsView.as_view(), name='admin_stats'),
@@ -1,14 +1,26 @@
-import uuid
 from datetime import datetime
+from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from services.mongo_service import mongo_service
 from services.notification_service import notification_service
+from services.pagination import MongoCursorPaginator, InvalidCursor
+from services import stats_service
+from services.catalog_cache import catalog_cache
+from services.order_events import TICKET_PURPOSE
+from services.stream_tickets import stream_ticket_store
+from services.id_generator import order_id_generator
+from services.idempotency import (
+    idempotency_store, get_idempotency_key, fingerprint, IdempotencyConflict, IdempotencyMismatch
+)
+from core.http_cache import ResponseCache, conditional_response
 from users.models import User
+from orders import projections
 
 class OrderListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    allow_field_selection = True
 
     def get(self, request):
         user_id = str(request.user.id)
@@ -16,7 +28,17 @@ class OrderListCreateView(APIView):
         
         # Always return only the current user's orders at this endpoint
         # Admins have a separate endpoint at /api/orders/admin/all/
-        orders = list(collection.find({'user_id': user_id}).sort('created_at', -1))
+        query = {'user_id': user_id}
+        # Optional comma-separated status filter, so history tabs are not limited to one page
+        status_filter = [s for s in request.query_params.get('status', '').split(',') if s]
+        if status_filter:
+            query['status'] = status_filter[0] if len(status_filter) == 1 else {'$in': status_filter}
+        try:
+            orders, next_cursor = MongoCursorPaginator().paginate(
+                collection, query, request, projection=projections.SUMMARY
+            )
+        except InvalidCursor:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Prefetch rider info for customer safety
         rider_ids = [o.get('assigned_rider_id') for o in orders if o.get('assigned_rider_id')]
@@ -30,9 +52,7 @@ class OrderListCreateView(APIView):
                     'profile_picture': rider.profile_picture.url if rider.profile_picture else None
                 }
 
-        # Convert ObjectId and datetime for JSON response
         for order in orders:
-            order['_id'] = str(order['_id'])
             # Add rider info
             rider_id = order.get('assigned_rider_id')
             order['rider_info'] = rider_map.get(rider_id) if rider_id else None
@@ -40,25 +60,58 @@ class OrderListCreateView(APIView):
             # Ensure pickup_location is a string for frontend display
             if isinstance(order.get('pickup_location'), dict):
                 order['pickup_location'] = order['pickup_location'].get('address', '')
-
-            if isinstance(order.get('created_at'), datetime):
-                order['created_at'] = order['created_at'].isoformat()
         
-        return Response(orders)
+        return Response({'results': orders, 'next': next_cursor})
 
     def post(self, request):
+        user = request.user
+        idempotency_key = get_idempotency_key(request)
+        if not idempotency_key:
+            return self.create_order(request)
+
+        scope = f'orders:{user.id}'
+        try:
+            record = idempotency_store.begin(scope, idempotency_key, fingerprint(request.data))
+        except IdempotencyMismatch:
+            return Response(
+                {'error': 'Idempotency-Key was already used with a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        except IdempotencyConflict:
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        if record is not None:
+            # Replay: return the order created by the original request
+            order = mongo_service.get_collection('orders').find_one({'order_id': record['result']['order_id']})
+            if order:
+                response = Response(order, status=status.HTTP_201_CREATED)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+        try:
+            response = self.create_order(request)
+        except Exception:
+            idempotency_store.release(scope, idempotency_key)
+            raise
+        idempotency_store.complete(scope, idempotency_key, {'order_id': response.data['order_id']})
+        return response
+
+    def create_order(self, request):
         data = request.data
         user = request.user
         items = data.get('items', [])
         
         # Security: Re-calculate total price from backend catalog prices
-        catalog_collection = mongo_service.get_collection('catalog')
+        # Match by name (since customer selects from the list we provided)
+        catalog_items = catalog_cache.get_many(item.get('name') for item in items)
         real_total = 0
         validated_items = []
         
         for item in items:
-            # Match by name (since customer selects from the list we provided)
-            catalog_item = catalog_collection.find_one({'name': item.get('name')})
+            catalog_item = catalog_items.get(item.get('name'))
             if catalog_item:
                 price_per_unit = catalog_item['price']
                 item['price_per_unit'] = price_per_unit # Ensure we use the correct price
@@ -70,8 +123,9 @@ class OrderListCreateView(APIView):
                 continue
 
         # Prepare order document
+        now = datetime.utcnow()
         order_doc = {
-            'order_id': f"ORD-{uuid.uuid4().hex[:6].upper()}",
+            'order_id': order_id_generator.next_order_id(now),
             'user_id': str(user.id),
             'customer_name': f"{user.first_name} {user.last_name}".strip() or user.username,
             'items': validated_items,
@@ -79,33 +133,75 @@ class OrderListCreateView(APIView):
             'status': 'PENDING',
             'pickup_location': data.get('location', user.location),
             'phone_number': data.get('phone_number', user.phone_number),
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
         
         collection = mongo_service.get_collection('orders')
-        result = collection.insert_one(order_doc)
-        order_doc['_id'] = str(result.inserted_id)
-        order_doc['created_at'] = order_doc['created_at'].isoformat()
-        order_doc['updated_at'] = order_doc['updated_at'].isoformat()
+        collection.insert_one(order_doc)
+        stats_service.record_order_created(order_doc)
 
         # Send Notifications
         notification_service.notify_order_placed(user, order_doc)
         
         return Response(order_doc, status=status.HTTP_201_CREATED)
 
+def _load_public_catalog():
+    items = [item for item in catalog_cache.get_items().values() if item.get('is_active') is True]
+
+    # Sort by category then name
+    items.sort(key=lambda x: (x['category'], x['name']))
+
+    timestamps = [item['updated_at'] for item in items if isinstance(item.get('updated_at'), datetime)]
+    return items, max(timestamps, default=None)
+
+
+def _load_public_reviews():
+    reviews_collection = mongo_service.get_collection('reviews')
+    # Get latest 10 reviews with 4+ stars
+    reviews = list(reviews_collection.find({'rating': {'$gte': 4}}).sort('created_at', -1).limit(10))
+
+    latest = None
+    for review in reviews:
+        if isinstance(review.get('created_at'), datetime):
+            latest = max(latest, review['created_at']) if latest else review['created_at']
+
+    return reviews, latest
+
+
+public_catalog_cache = ResponseCache(_load_public_catalog, version_fn=catalog_cache.current_version)
+public_reviews_cache = ResponseCache(_load_public_reviews, ttl=settings.PUBLIC_CACHE_MAX_AGE)
+
+
+class OrderSummaryView(APIView):
+    """Totals over the current user's whole order history, so clients need not fetch every page."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        collection = mongo_service.get_collection('orders')
+        totals = next(collection.aggregate([
+            {'$match': {'user_id': str(request.user.id)}},
+            {'$group': {
+                '_id': None,
+                'orders': {'$sum': 1},
+                'items': {'$sum': {'$size': {'$ifNull': ['$items', []]}}},
+                'spent': {'$sum': '$total_price'},
+            }},
+        ]), None) or {}
+
+        return Response({
+            'orders': totals.get('orders', 0),
+            'items': totals.get('items', 0),
+            'spent': totals.get('spent', 0),
+        })
+
+
 class CatalogListView(APIView):
     """Fetch all available laundry items and prices."""
     permission_classes = [permissions.AllowAny] # Publicly viewable
 
     def get(self, request):
-        collection = mongo_service.get_collection('catalog')
-        items = list(collection.find({'is_active': True}, {'_id': 0}).sort('category', 1))
-        
-        # Sort by category then name
-        items.sort(key=lambda x: (x['category'], x['name']))
-        
-        return Response(items)
+        return conditional_response(request, public_catalog_cache.get())
 
 class OrderDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -133,12 +229,6 @@ class OrderDetailView(APIView):
                 }
             except User.DoesNotExist:
                 order['rider_info'] = None
-
-        order['_id'] = str(order['_id'])
-        if isinstance(order.get('created_at'), datetime):
-            order['created_at'] = order['created_at'].isoformat()
-        if isinstance(order.get('updated_at'), datetime):
-            order['updated_at'] = order['updated_at'].isoformat()
             
         return Response(order)
             
@@ -194,6 +284,9 @@ class ReviewCreateView(APIView):
         }
         
         reviews_collection.insert_one(review_doc)
+        stats_service.record_review_created()
+        if rating >= 4:
+            public_reviews_cache.invalidate()
         
         # Update order to mark it as reviewed
         collection.update_one({'order_id': order_id}, {'$set': {'is_reviewed': True}})
@@ -205,13 +298,22 @@ class PublicReviewListView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        reviews_collection = mongo_service.get_collection('reviews')
-        # Get latest 10 reviews with 4+ stars
-        reviews = list(reviews_collection.find({'rating': {'$gte': 4}}).sort('created_at', -1).limit(10))
+        return conditional_response(request, public_reviews_cache.get())
 
-        for review in reviews:
-            review['_id'] = str(review['_id'])
-            if isinstance(review.get('created_at'), datetime):
-                review['created_at'] = review['created_at'].isoformat()
-        
-        return Response(reviews)
+
+class OrderEventTicketView(APIView):
+    """
+    Issue a single-use ticket for the order events stream.
+
+    EventSource cannot send the JWT header, so clients POST here first and
+    open ORDER_EVENTS_PATH with the returned `?ticket=` within `expires_in` seconds.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ticket = stream_ticket_store.issue(request.user.id, TICKET_PURPOSE)
+        return Response({
+            'ticket': ticket,
+            'expires_in': stream_ticket_store.ttl,
+            'url': f"{settings.ORDER_EVENTS_PATH}?ticket={ticket}",
+        }, status=status.HTTP_201_CREATED)
@@ -2,5 +2,21 @@
 set -euo pipefail
 
 python manage.py migrate --noinput
+python manage.py ensure_mongo_indexes
 python manage.py collectstatic --noinput
-gunicorn core.wsgi:application --bind "0.0.0.0:${PORT:-8000}" --workers 3
+
+# Railway runs a single start command per service, so the notification outbox
+# worker runs alongside the web process (restarted if it exits). Notifications
+# are only queued by the web process; without a worker none would ever be sent.
+# To run the worker as its own Railway service instead, point that service at
+# railway.worker.json and set RUN_NOTIFICATION_WORKER=false here.
+if [ "${RUN_NOTIFICATION_WORKER:-true}" = "true" ]; then
+  (
+    while true; do
+      python manage.py run_notification_worker || true
+      sleep 5
+    done
+  ) &
+fi
+
+exec gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --bind "0.0.0.0:${PORT:-8000}" --workers 3
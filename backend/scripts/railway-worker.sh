@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Dedicated notification outbox worker (see railway.worker.json)
+exec python manage.py run_notification_worker
@@ -0,0 +1,99 @@
+"""
+In-process Catalog Cache
+
+Order creation needs the price of every basket item. The whole catalog is
+small, so each worker keeps it in memory:
+- A warm cache answers lookups with zero MongoDB round trips
+- A cold/expired cache is reloaded with one query
+- Names missing from a warm cache (e.g. added by another worker) are fetched
+  with a single `$in` query
+Admin catalog writes call `invalidate()`; other workers pick changes up when
+CATALOG_CACHE_TTL expires.
+"""
+import threading
+import time
+from django.conf import settings
+from services.mongo_service import mongo_service
+
+
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = None
+        self._expires_at = 0
+        self._version = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CATALOG_CACHE_TTL', 60)
+
+    @property
+    def version(self):
+        """Incremented every time the cached catalog is reloaded or invalidated."""
+        return self._version
+
+    def _collection(self):
+        return mongo_service.get_collection('catalog')
+
+    def _is_fresh(self):
+        return self._items is not None and time.monotonic() < self._expires_at
+
+    def _reload(self):
+        items = {item['name']: item for item in self._collection().find({}, {'_id': 0})}
+        with self._lock:
+            self._items = items
+            self._expires_at = time.monotonic() + self.ttl
+            self._version += 1
+        return items
+
+    def _get_fresh(self):
+        with self._lock:
+            return self._items if self._is_fresh() else None
+
+    def get_items(self):
+        """Return {name: item} for the whole catalog, reloading if stale."""
+        items = self._get_fresh()
+        if items is None:
+            items = self._reload()
+        return items
+
+    def current_version(self):
+        """Version of the catalog as of now, reloading it first if stale."""
+        self.get_items()
+        return self._version
+
+    def get_many(self, names):
+        """
+        Resolve catalog items by name in at most one round trip.
+
+        Returns {name: item} for the names that exist in the catalog.
+        """
+        names = {name for name in names if name}
+        items = self._get_fresh()
+
+        if items is None:
+            items = self._reload()
+        else:
+            missing = [name for name in names if name not in items]
+            if missing:
+                fetched = {
+                    item['name']: item
+                    for item in self._collection().find({'name': {'$in': missing}}, {'_id': 0})
+                }
+                if fetched:
+                    with self._lock:
+                        if self._items is not None:
+                            self._items = {**self._items, **fetched}
+                    items = {**items, **fetched}
+
+        return {name: items[name] for name in names if name in items}
+
+    def invalidate(self):
+        with self._lock:
+            self._items = None
+            self._expires_at = 0
+            self._version += 1
+
+
+# Singleton instance
+catalog_cache = CatalogCache()
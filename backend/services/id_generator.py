@@ -0,0 +1,41 @@
+"""
+Order ID Generator
+
+Order IDs look like `ORD-YYMMDD-NNNNN`: the UTC creation day followed by a
+per-day sequence number handed out by an atomic `$inc` on the
+`order_sequences` MongoDB collection (one tiny document per day):
+- Unique by construction, and backed by the unique index on orders.order_id
+- Sort by creation time, so IDs from the same period cluster together
+- Still short enough to read out over the phone
+"""
+from datetime import datetime
+from pymongo import ReturnDocument
+from services.mongo_service import mongo_service
+
+
+class OrderIdGenerator:
+    COLLECTION = 'order_sequences'
+    PREFIX = 'ORD'
+    SEQUENCE_WIDTH = 5
+
+    @property
+    def collection(self):
+        return mongo_service.get_collection(self.COLLECTION)
+
+    def next_sequence(self, day):
+        doc = self.collection.find_one_and_update(
+            {'_id': day},
+            {'$inc': {'seq': 1}, '$setOnInsert': {'created_at': datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc['seq']
+
+    def next_order_id(self, moment=None):
+        """Return a new order ID for an order created at `moment` (default: now, UTC)."""
+        day = (moment or datetime.utcnow()).strftime('%y%m%d')
+        return f"{self.PREFIX}-{day}-{self.next_sequence(day):0{self.SEQUENCE_WIDTH}d}"
+
+
+# Singleton instance
+order_id_generator = OrderIdGenerator()
@@ -0,0 +1,126 @@
+"""
+Idempotency Key Store
+
+Clients on flaky networks retry POSTs. When they send an `Idempotency-Key`
+header, the first request claims the key in the `idempotency_keys` MongoDB
+collection (the key is the document `_id`, so the claim is a single unique
+insert) and records what it created; replays get that result back instead
+of repeating the work:
+- Keys are scoped per user, so two users can never collide
+- A request body that differs from the original one is rejected
+- A claim left behind by a crashed request can be taken over after
+  IDEMPOTENCY_LOCK_TIMEOUT seconds
+- Keys expire after 24 hours (TTL index on created_at)
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from django.conf import settings
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.mongo_service import mongo_service
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key is in use by a request that has not finished yet."""
+
+
+class IdempotencyMismatch(Exception):
+    """The key was already used with a different request body."""
+
+
+def get_idempotency_key(request):
+    """Return the request's Idempotency-Key header, or None if absent."""
+    key = request.META.get(IDEMPOTENCY_HEADER, '').strip()
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def fingerprint(data):
+    raw = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+class IdempotencyStore:
+    COLLECTION = 'idempotency_keys'
+
+    IN_PROGRESS = 'IN_PROGRESS'
+    COMPLETED = 'COMPLETED'
+
+    @property
+    def collection(self):
+        return mongo_service.get_collection(self.COLLECTION)
+
+    @property
+    def lock_timeout(self):
+        return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+    def _id(self, scope, key):
+        return f'{scope}:{key}'
+
+    def begin(self, scope, key, request_fingerprint):
+        """
+        Claim `key` for a new request.
+
+        Returns None if the caller now owns the key and should do the work, or
+        the stored record (with `result`) if an earlier request completed.
+        Raises IdempotencyConflict or IdempotencyMismatch otherwise.
+        """
+        doc_id = self._id(scope, key)
+        now = datetime.utcnow()
+        try:
+            self.collection.insert_one({
+                '_id': doc_id,
+                'status': self.IN_PROGRESS,
+                'fingerprint': request_fingerprint,
+                'created_at': now,
+                'locked_at': now,
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        record = self.collection.find_one({'_id': doc_id})
+        if record is None:
+            # Expired between the insert and the read; try once more
+            return self.begin(scope, key, request_fingerprint)
+
+        if record.get('fingerprint') != request_fingerprint:
+            raise IdempotencyMismatch()
+
+        if record['status'] == self.COMPLETED:
+            return record
+
+        # Take over a claim abandoned by a request that crashed mid-way
+        taken = self.collection.find_one_and_update(
+            {
+                '_id': doc_id,
+                'status': self.IN_PROGRESS,
+                'locked_at': {'$lte': now - timedelta(seconds=self.lock_timeout)},
+            },
+            {'$set': {'locked_at': now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if taken is None:
+            raise IdempotencyConflict()
+        return None
+
+    def complete(self, scope, key, result):
+        """Record the outcome so replays can return it."""
+        self.collection.update_one(
+            {'_id': self._id(scope, key)},
+            {
+                '$set': {'status': self.COMPLETED, 'result': result, 'completed_at': datetime.utcnow()},
+                '$unset': {'locked_at': ''},
+            }
+        )
+
+    def release(self, scope, key):
+        """Forget a claim whose request failed, so the client can retry with the same key."""
+        self.collection.delete_one({'_id': self._id(scope, key), 'status': self.IN_PROGRESS})
+
+
+# Singleton instance
+idempotency_store = IdempotencyStore()
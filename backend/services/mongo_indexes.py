@@ -0,0 +1,160 @@
+"""
+Declarative MongoDB Index Registry
+
+Every collection the API queries declares its indexes here so they can be
+built idempotently (see `manage.py ensure_mongo_indexes`) instead of being
+created ad hoc from a shell:
+- orders: order_id lookups, per-customer history, rider task boards and delta sync, admin lists
+- catalog: name lookups and the public active-items listing
+- reviews / complaints / commissions: dashboard and ambassador queries
+- notification_outbox: worker polling and cleanup of delivered entries
+- idempotency_keys: expiry of stored Idempotency-Key results
+- stream_tickets: expiry of event stream tickets that were never redeemed
+- rider_stats_cache: cleanup of cached rider counters nobody has read lately
+- rider_tracks: per-rider track lookups (a time-series collection, created
+  here before its indexes since MongoDB only makes time-series collections
+  on explicit request)
+"""
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+MONGO_INDEXES = {
+    'orders': [
+        IndexModel([('order_id', ASCENDING)], name='order_id_unique', unique=True),
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='user_created'),
+        IndexModel([('assigned_rider_id', ASCENDING), ('status', ASCENDING)], name='rider_status'),
+        IndexModel([('assigned_rider_id', ASCENDING), ('updated_at', ASCENDING)], name='rider_updated'),
+        IndexModel([('unassigned_rider_ids', ASCENDING), ('updated_at', ASCENDING)], name='unassigned_rider_updated'),
+        IndexModel([('status', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='status_created'),
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)], name='created'),
+    ],
+    'catalog': [
+        IndexModel([('name', ASCENDING)], name='name_unique', unique=True),
+        IndexModel([('is_active', ASCENDING), ('category', ASCENDING), ('name', ASCENDING)], name='active_category_name'),
+    ],
+    'reviews': [
+        IndexModel([('order_id', ASCENDING)], name='order_id_unique', unique=True),
+        IndexModel([('rating', ASCENDING), ('created_at', DESCENDING)], name='rating_created'),
+        IndexModel([('created_at', DESCENDING)], name='created'),
+    ],
+    'complaints': [
+        IndexModel([('created_at', DESCENDING)], name='created'),
+    ],
+    'commissions': [
+        IndexModel([('order_id', ASCENDING)], name='order_id_unique', unique=True),
+        IndexModel([('ambassador_id', ASCENDING), ('created_at', DESCENDING)], name='ambassador_created'),
+    ],
+    'notification_outbox': [
+        IndexModel([('status', ASCENDING), ('next_attempt_at', ASCENDING)], name='status_next_attempt'),
+        IndexModel([('status', ASCENDING), ('locked_at', ASCENDING)], name='status_locked'),
+        # Delivered entries are purged a week after sending
+        IndexModel([('sent_at', ASCENDING)], name='sent_ttl', expireAfterSeconds=7 * 24 * 3600),
+    ],
+    'idempotency_keys': [
+        # Keys are looked up by _id; this only expires them after a day
+        IndexModel([('created_at', ASCENDING)], name='created_ttl', expireAfterSeconds=24 * 3600),
+    ],
+    'stream_tickets': [
+        # Tickets are redeemed by _id; this only drops them once expires_at passes
+        IndexModel([('expires_at', ASCENDING)], name='expires_ttl', expireAfterSeconds=0),
+    ],
+    'rider_stats_cache': [
+        # Entries are looked up by _id (the rider id); this only drops idle ones
+        IndexModel([('updated_at', ASCENDING)], name='updated_ttl', expireAfterSeconds=24 * 3600),
+    ],
+    'rider_tracks': [
+        IndexModel([('rider_id', ASCENDING), ('timestamp', DESCENDING)], name='rider_timestamp'),
+    ],
+}
+
+# Collections that need options at creation time
+MONGO_COLLECTIONS = {
+    'rider_tracks': {
+        'timeseries': {'timeField': 'timestamp', 'metaField': 'rider_id', 'granularity': 'seconds'},
+        # Downsampled tracks are kept for 30 days
+        'expireAfterSeconds': 30 * 24 * 3600,
+    },
+}
+
+
+def ensure_collections(db, dry_run=False):
+    """Create declared collections that do not exist yet. Returns the names created (or missing, on a dry run)."""
+    existing = set(db.list_collection_names())
+    created = []
+    for collection_name, options in MONGO_COLLECTIONS.items():
+        if collection_name in existing:
+            continue
+        if not dry_run:
+            try:
+                db.create_collection(collection_name, **options)
+            except OperationFailure as e:
+                logger.error(f"Failed to create collection {collection_name}: {e}")
+                continue
+        created.append(collection_name)
+    return created
+
+
+def get_index_report(db, collection_name, indexes):
+    """
+    Compare the declared indexes of one collection with what exists on the server.
+
+    Returns a dict with:
+        missing: declared index names not present on the collection
+        unmanaged: index names present on the collection but not declared here
+        unused: index names with zero recorded accesses (None if $indexStats is unavailable)
+    """
+    collection = db[collection_name]
+    existing = collection.index_information()
+    declared = [index.document['name'] for index in indexes]
+
+    report = {
+        'missing': [name for name in declared if name not in existing],
+        'unmanaged': [name for name in existing if name != '_id_' and name not in declared],
+        'unused': None,
+    }
+
+    try:
+        stats = list(collection.aggregate([{'$indexStats': {}}]))
+        report['unused'] = [
+            s['name'] for s in stats
+            if s['name'] != '_id_' and s.get('accesses', {}).get('ops', 0) == 0
+        ]
+    except OperationFailure as e:
+        # $indexStats is not permitted on some shared/free tiers
+        logger.warning(f"$indexStats unavailable for {collection_name}: {e}")
+
+    return report
+
+
+def ensure_indexes(db, dry_run=False):
+    """
+    Build every declared index that is missing. Safe to run repeatedly.
+
+    Returns a dict keyed by collection name with the report from
+    `get_index_report` plus `created` and `errors` lists.
+    """
+    results = {}
+    for collection_name, indexes in MONGO_INDEXES.items():
+        report = get_index_report(db, collection_name, indexes)
+        report['created'] = []
+        report['errors'] = []
+
+        if not dry_run:
+            for index in indexes:
+                name = index.document['name']
+                if name not in report['missing']:
+                    continue
+                try:
+                    db[collection_name].create_indexes([index])
+                    report['created'].append(name)
+                except OperationFailure as e:
+                    # e.g. duplicate keys blocking a unique index, or the same keys under another name
+                    report['errors'].append(f"{name}: {e}")
+                    logger.error(f"Failed to create index {collection_name}.{name}: {e}")
+
+        results[collection_name] = report
+    return results
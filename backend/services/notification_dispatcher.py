@@ -0,0 +1,148 @@
+"""
+Concurrent Notification Fan-out
+
+Sends independent messages (customer SMS, rider SMS, admin SMS, emails...)
+in parallel on a shared thread pool instead of one after another:
+- Per-channel concurrency limits keep us inside provider rate limits. A slot
+  is taken before a message is submitted, so messages waiting on a busy
+  channel never occupy pool threads
+- An overall deadline bounds how long a caller waits for the whole batch
+- A send still running at the deadline is reported as in flight, not failed:
+  it may yet succeed, and retrying it could deliver the message twice.
+  `on_complete` is called with its eventual result
+- Results come back per message and can be grouped per recipient
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutDispatcher:
+    def __init__(self, max_workers=None, channel_limits=None, deadline=None):
+        self.max_workers = max_workers or getattr(settings, 'NOTIFICATION_FANOUT_MAX_WORKERS', 8)
+        self.channel_limits = channel_limits or getattr(settings, 'NOTIFICATION_CHANNEL_CONCURRENCY', {})
+        self.deadline = deadline or getattr(settings, 'NOTIFICATION_FANOUT_DEADLINE', 15)
+        self._executor = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        # Guards `_in_flight` and the per-dispatch `late` flags; notified when a slot frees up
+        self._slots = threading.Condition()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='notify',
+                )
+            return self._executor
+
+    def channel_limit(self, channel):
+        """How many messages on `channel` may be sending at once."""
+        return max(1, self.channel_limits.get(channel, self.max_workers))
+
+    def _submit_within_limits(self, messages, send, expires_at, on_done):
+        """
+        Submit each message once its channel has a free slot, until `expires_at`.
+
+        Returns a list aligned with `messages` holding a future, or None for
+        messages that never got a slot.
+        """
+        executor = self._get_executor()
+        futures = [None] * len(messages)
+        waiting = list(range(len(messages)))
+
+        with self._slots:
+            while waiting:
+                blocked = []
+                for index in waiting:
+                    channel = messages[index]['channel']
+                    if self._in_flight.get(channel, 0) >= self.channel_limit(channel):
+                        blocked.append(index)
+                        continue
+                    self._in_flight[channel] = self._in_flight.get(channel, 0) + 1
+                    future = executor.submit(send, messages[index])
+                    future.add_done_callback(lambda f, i=index: on_done(i, f))
+                    futures[index] = future
+                waiting = blocked
+                remaining = expires_at - time.monotonic()
+                if not waiting or remaining <= 0:
+                    break
+                self._slots.wait(remaining)
+
+        return futures
+
+    @staticmethod
+    def _outcome(future):
+        if future.exception() is not None:
+            return {'success': False, 'error': str(future.exception())}
+        return {'success': bool(future.result())}
+
+    def dispatch(self, messages, send, deadline=None, on_complete=None):
+        """
+        Call `send(message)` for every message concurrently.
+
+        Returns a list of result dicts aligned with `messages`:
+            {'channel', 'recipient', 'success'[, 'error'][, 'in_flight']}
+        Messages that could not start before the deadline are reported as
+        failed (nothing was sent). Messages still sending at the deadline are
+        reported with `in_flight: True` and `success: None`; once they finish,
+        `on_complete(message, {'success'[, 'error']})` is called from the
+        sending thread.
+        """
+        if not messages:
+            return []
+
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        late = set()
+
+        def on_done(index, future):
+            message = messages[index]
+            with self._slots:
+                self._in_flight[message['channel']] -= 1
+                self._slots.notify_all()
+                reported_late = index in late
+            if reported_late and on_complete is not None and not future.cancelled():
+                try:
+                    on_complete(message, self._outcome(future))
+                except Exception as e:
+                    logger.error(f"Late notification result handler failed: {e}")
+
+        futures = self._submit_within_limits(messages, send, expires_at, on_done)
+        wait([f for f in futures if f is not None], timeout=max(0, expires_at - time.monotonic()))
+
+        results = []
+        for index, (message, future) in enumerate(zip(messages, futures)):
+            result = {'channel': message['channel'], 'recipient': message['recipient']}
+            with self._slots:
+                finished = future is not None and future.done()
+                in_flight = future is not None and not finished and not future.cancel()
+                if in_flight:
+                    late.add(index)
+
+            if in_flight:
+                result.update(success=None, in_flight=True, error='Deadline exceeded while sending')
+                logger.warning(f"Notification to {message['recipient']} via {message['channel']} still sending at the deadline")
+            elif not finished:
+                result.update(success=False, error='Deadline exceeded before sending')
+            else:
+                result.update(self._outcome(future))
+            results.append(result)
+        return results
+
+
+def group_by_recipient(results):
+    """Turn a list of dispatch results into {recipient: {channel: result}}."""
+    grouped = {}
+    for result in results:
+        entry = {k: v for k, v in result.items() if k not in ('channel', 'recipient')}
+        grouped.setdefault(result['recipient'], {})[result['channel']] = entry
+    return grouped
+
+
+# Singleton instance
+fanout_dispatcher = FanOutDispatcher()
@@ -0,0 +1,127 @@
+"""
+Durable Notification Outbox
+
+API views enqueue notifications into the `notification_outbox` MongoDB
+collection (one insert per request) instead of calling Twilio/SMTP inline.
+`manage.py run_notification_worker` drains it:
+- Entries are claimed atomically, so several workers can run side by side
+- Failed sends are retried with exponential backoff
+- Entries that keep failing are parked as FAILED after NOTIFICATION_MAX_ATTEMPTS
+- Claims left behind by a crashed worker are picked up again after
+  NOTIFICATION_LOCK_TIMEOUT seconds
+"""
+import logging
+from datetime import datetime, timedelta
+from django.conf import settings
+from pymongo import ASCENDING, ReturnDocument
+from services.mongo_service import mongo_service
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    COLLECTION = 'notification_outbox'
+
+    PENDING = 'PENDING'
+    SENDING = 'SENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+
+    @property
+    def collection(self):
+        return mongo_service.get_collection(self.COLLECTION)
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+
+    @property
+    def retry_base_seconds(self):
+        return getattr(settings, 'NOTIFICATION_RETRY_BASE_SECONDS', 30)
+
+    @property
+    def retry_max_seconds(self):
+        return getattr(settings, 'NOTIFICATION_RETRY_MAX_SECONDS', 3600)
+
+    @property
+    def lock_timeout(self):
+        return getattr(settings, 'NOTIFICATION_LOCK_TIMEOUT', 300)
+
+    def enqueue_many(self, messages):
+        """
+        Queue messages for delivery in a single insert.
+
+        Each message is a dict with `channel`, `recipient`, `message` and optional `kwargs`.
+        """
+        if not messages:
+            return []
+        now = datetime.utcnow()
+        docs = [
+            {
+                'channel': m['channel'],
+                'recipient': m['recipient'],
+                'message': m['message'],
+                'kwargs': m.get('kwargs') or {},
+                'status': self.PENDING,
+                'attempts': 0,
+                'next_attempt_at': now,
+                'created_at': now,
+            }
+            for m in messages
+        ]
+        result = self.collection.insert_many(docs, ordered=False)
+        return result.inserted_ids
+
+    def claim_next(self):
+        """Atomically claim the next due entry, or return None if nothing is due."""
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {'$or': [
+                {'status': self.PENDING, 'next_attempt_at': {'$lte': now}},
+                {'status': self.SENDING, 'locked_at': {'$lte': now - timedelta(seconds=self.lock_timeout)}},
+            ]},
+            {
+                '$set': {'status': self.SENDING, 'locked_at': now},
+                '$inc': {'attempts': 1},
+            },
+            sort=[('next_attempt_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def claim_batch(self, limit):
+        batch = []
+        while len(batch) < limit:
+            entry = self.claim_next()
+            if entry is None:
+                break
+            batch.append(entry)
+        return batch
+
+    def mark_sent(self, entry):
+        self.collection.update_one(
+            {'_id': entry['_id']},
+            {
+                '$set': {'status': self.SENT, 'sent_at': datetime.utcnow()},
+                '$unset': {'locked_at': '', 'last_error': ''},
+            }
+        )
+
+    def mark_failed(self, entry, error=None):
+        """Schedule a retry with exponential backoff, or park the entry as FAILED."""
+        attempts = entry.get('attempts', 1)
+        update = {'last_error': error or 'Send failed'}
+
+        if attempts >= self.max_attempts:
+            update['status'] = self.FAILED
+            logger.error(f"Notification {entry['_id']} failed permanently after {attempts} attempts: {error}")
+        else:
+            delay = min(self.retry_base_seconds * (2 ** (attempts - 1)), self.retry_max_seconds)
+            update['status'] = self.PENDING
+            update['next_attempt_at'] = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Notification {entry['_id']} failed (attempt {attempts}), retrying in {delay}s: {error}")
+
+        self.collection.update_one({'_id': entry['_id']}, {'$set': update, '$unset': {'locked_at': ''}})
+
+
+# Singleton instance
+notification_outbox = NotificationOutbox()
@@ -5,11 +5,19 @@ Supports:
 - Email via Django SMTP
 - SMS via Twilio
 - WhatsApp via Twilio
+
+Delivery is asynchronous through the notification outbox (see notification_outbox.py).
 """
 import logging
+import smtplib
+import threading
+import time
 from abc import ABC, abstractmethod
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from services.notification_outbox import notification_outbox
+from services.notification_dispatcher import fanout_dispatcher, group_by_recipient
+from services.twilio_service import get_twilio_client
 
 logger = logging.getLogger(__name__)
 
@@ -43,51 +51,149 @@ class BaseNotificationChannel(ABC):
 
 
 class EmailChannel(BaseNotificationChannel):
-    """Send emails using Django's SMTP backend."""
-    
-    def send(self, recipient, message, **kwargs):
-        subject = kwargs.get('subject', 'Abba EZWash Notification')
+    """
+    Send emails using Django's SMTP backend.
+
+    Keeps a small pool of open SMTP connections so bursts of emails reuse
+    TLS sessions. Each concurrent send checks out its own connection, so up
+    to NOTIFICATION_CHANNEL_CONCURRENCY['email'] emails go out in parallel,
+    and at most that many connections are kept idle. `send_many` sends a
+    whole batch over one connection. Connections idle for more than
+    EMAIL_CONNECTION_MAX_IDLE seconds, or dropped by the server, are replaced.
+    """
+
+    def __init__(self):
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._lock = threading.Lock()
+
+    @property
+    def max_idle(self):
+        return getattr(settings, 'EMAIL_CONNECTION_MAX_IDLE', 60)
+
+    @property
+    def max_pool_size(self):
+        # No more connections are ever in use at once than emails sent at once
+        return fanout_dispatcher.channel_limit('email')
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _open(self):
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        return connection
+
+    def _checkout(self):
+        """Take a fresh idle connection from the pool, or open a new one."""
+        stale = []
+        connection = None
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if time.monotonic() - last_used <= self.max_idle:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            self._close(candidate)
+        return connection or self._open()
+
+    def _checkin(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_pool_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._close(connection)
+
+    def _build_message(self, recipient, message, **kwargs):
+        email = EmailMultiAlternatives(
+            subject=kwargs.get('subject', 'Abba EZWash Notification'),
+            body=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[recipient],
+        )
         html_message = kwargs.get('html_message')
-        
+        if html_message:
+            email.attach_alternative(html_message, 'text/html')
+        return email
+
+    def _send_pooled(self, connection, email):
+        """
+        Send one email on `connection`, reconnecting once if the server dropped it.
+
+        Returns the connection now in use and whether the email was sent.
+        """
         try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[recipient],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            logger.info(f"Email sent successfully to {recipient}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send email to {recipient}: {e}")
-            return False
+            return connection, connection.send_messages([email]) == 1
+        except smtplib.SMTPServerDisconnected:
+            self._close(connection)
+            connection = self._open()
+            try:
+                return connection, connection.send_messages([email]) == 1
+            except Exception:
+                self._close(connection)
+                raise
+
+    def send(self, recipient, message, **kwargs):
+        return self.send_many([{'recipient': recipient, 'message': message, 'kwargs': kwargs}])[0]
+
+    def send_many(self, messages):
+        """
+        Send a batch of emails over a single pooled SMTP connection.
+
+        `messages` is a list of dicts with `recipient`, `message` and optional `kwargs`.
+        Returns a list of booleans aligned with `messages`.
+        """
+        results = []
+        connection = None
+        for m in messages:
+            recipient = m['recipient']
+            try:
+                email = self._build_message(recipient, m['message'], **(m.get('kwargs') or {}))
+                if connection is None:
+                    connection = self._checkout()
+                # One message per call, on the same connection, so each email
+                # gets its own result and one failure does not abort the batch
+                connection, success = self._send_pooled(connection, email)
+                if success:
+                    logger.info(f"Email sent successfully to {recipient}")
+                results.append(success)
+            except smtplib.SMTPRecipientsRefused as e:
+                # Bad address: the connection is still usable for the rest of the batch
+                logger.error(f"Failed to send email to {recipient}: {e}")
+                results.append(False)
+            except Exception as e:
+                logger.error(f"Failed to send email to {recipient}: {e}")
+                if connection is not None:
+                    self._close(connection)
+                    connection = None
+                results.append(False)
+        if connection is not None:
+            self._checkin(connection)
+        if len(messages) > 1:
+            logger.info(f"Email batch sent: {sum(results)}/{len(messages)} delivered")
+        return results
 
 
 class SMSChannel(BaseNotificationChannel):
     """Send SMS using Twilio."""
     
     def __init__(self):
-        self.client = None
         self.from_number = getattr(settings, 'TWILIO_PHONE_NUMBER', None)
         self.messaging_service_sid = getattr(settings, 'TWILIO_MESSAGING_SERVICE_SID', None)
-        
-        account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
-        auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
-        
-        if account_sid and auth_token:
-            try:
-                from twilio.rest import Client
-                self.client = Client(account_sid, auth_token)
-            except ImportError:
-                logger.warning("Twilio package not installed. SMS disabled.")
-        else:
-            logger.warning("Twilio credentials not configured. SMS disabled.")
+
+    @property
+    def client(self):
+        # Shared, pooled client (see twilio_service.get_twilio_client)
+        return get_twilio_client()
     
     def send(self, recipient, message, **kwargs):
         recipient = self._format_phone_number(recipient)
-        if not self.client or (not self.from_number and not self.messaging_service_sid):
+        client = self.client
+        if not client or (not self.from_number and not self.messaging_service_sid):
             logger.info(f"[SMS Mock] Would send to {recipient}: {message}")
             return True  # Mock success
         
@@ -101,7 +207,7 @@ class SMSChannel(BaseNotificationChannel):
             else:
                 params['from_'] = self.from_number
 
-            self.client.messages.create(**params)
+            client.messages.create(**params)
             logger.info(f"SMS sent successfully to {recipient}")
             return True
         except Exception as e:
@@ -113,30 +219,22 @@ class WhatsAppChannel(BaseNotificationChannel):
     """Send WhatsApp messages using Twilio."""
     
     def __init__(self):
-        self.client = None
         self.from_number = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', None)
-        
-        account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
-        auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
-        
-        if account_sid and auth_token:
-            try:
-                from twilio.rest import Client
-                self.client = Client(account_sid, auth_token)
-            except ImportError:
-                logger.warning("Twilio package not installed. WhatsApp disabled.")
-        else:
-            logger.warning("Twilio credentials not configured. WhatsApp disabled.")
+
+    @property
+    def client(self):
+        return get_twilio_client()
     
     def send(self, recipient, message, **kwargs):
         recipient = self._format_phone_number(recipient)
-        if not self.client or not self.from_number:
+        client = self.client
+        if not client or not self.from_number:
             logger.info(f"[WhatsApp Mock] Would send to {recipient}: {message}")
             return True  # Mock success
         
         try:
             # WhatsApp requires 'whatsapp:' prefix
-            self.client.messages.create(
+            client.messages.create(
                 body=message,
                 from_=f"whatsapp:{self.from_number}",
                 to=f"whatsapp:{recipient}"
@@ -149,7 +247,14 @@ class WhatsAppChannel(BaseNotificationChannel):
 
 
 class NotificationService:
-    """Unified notification service for all channels."""
+    """
+    Unified notification service for all channels.
+
+    Messages are queued in the notification outbox and delivered by
+    `manage.py run_notification_worker`. With NOTIFICATION_OUTBOX_ENABLED off
+    (or if the outbox is unreachable) they are sent inline instead, fanned out
+    concurrently across recipients and channels.
+    """
     
     def __init__(self):
         self.channels = {
@@ -158,19 +263,97 @@ class NotificationService:
             'whatsapp': WhatsAppChannel()
         }
 
-    def notify(self, user, message, channels=None, **kwargs):
+    def _dispatch(self, messages):
         """
-        Send notification to user via specified channels.
-        
-        Args:
-            user: User object with email/phone_number attributes
-            message: Notification message
-            channels: List of channels ['email', 'sms', 'whatsapp']
-            **kwargs: Additional params (subject, html_message, etc.)
+        Queue messages in the outbox, falling back to sending them inline.
+
+        Returns one result dict per message (see FanOutDispatcher.dispatch).
         """
-        if channels is None:
-            channels = ['email']
-            
+        if not messages:
+            return []
+
+        if getattr(settings, 'NOTIFICATION_OUTBOX_ENABLED', True):
+            try:
+                notification_outbox.enqueue_many(messages)
+                return [
+                    {'channel': m['channel'], 'recipient': m['recipient'], 'success': True, 'queued': True}
+                    for m in messages
+                ]
+            except Exception as e:
+                logger.error(f"Failed to queue notifications, sending inline: {e}")
+
+        return self.deliver_many(messages)
+
+    def deliver_many(self, messages, deadline=None, on_complete=None):
+        """
+        Send several messages concurrently. Returns one result dict per message.
+
+        Emails are split into at most NOTIFICATION_CHANNEL_CONCURRENCY['email']
+        batches, each sent over one SMTP connection (EmailChannel.send_many).
+        See FanOutDispatcher.dispatch for messages still in flight at the deadline.
+        """
+        # Units are what the dispatcher sends: single messages, or email batches
+        positions = [index for index, m in enumerate(messages) if m['channel'] != 'email']
+        units = [messages[index] for index in positions]
+        emails = [index for index, m in enumerate(messages) if m['channel'] == 'email']
+        batch_count = min(len(emails), fanout_dispatcher.channel_limit('email'))
+        for offset in range(batch_count):
+            indexes = emails[offset::batch_count]
+            positions.append(indexes)
+            units.append({
+                'channel': 'email',
+                'recipient': f"{len(indexes)} email recipients",
+                'batch': [messages[index] for index in indexes],
+            })
+
+        def unit_complete(unit, outcome):
+            if 'batch' not in unit:
+                return on_complete(unit, outcome)
+            for message, result in zip(unit['batch'], self._batch_results(unit, outcome)):
+                on_complete(message, result)
+
+        outcomes = fanout_dispatcher.dispatch(
+            units, self._deliver_unit, deadline=deadline,
+            on_complete=unit_complete if on_complete is not None else None,
+        )
+
+        results = [None] * len(messages)
+        for position, unit, outcome in zip(positions, units, outcomes):
+            if 'batch' not in unit:
+                results[position] = outcome
+                continue
+            for index, message, result in zip(position, unit['batch'], self._batch_results(unit, outcome)):
+                results[index] = {'channel': 'email', 'recipient': message['recipient'], **result}
+        return results
+
+    def _deliver_unit(self, unit):
+        if 'batch' not in unit:
+            return self.deliver(unit)
+        unit['results'] = self.channels['email'].send_many(unit['batch'])
+        return all(unit['results'])
+
+    def _batch_results(self, unit, outcome):
+        """Per-message results of an email batch, given the dispatcher's outcome for the whole batch."""
+        outcome = {k: v for k, v in outcome.items() if k not in ('channel', 'recipient')}
+        if outcome.get('in_flight') or 'results' not in unit:
+            # Still sending, or never sent: every message shares the outcome
+            return [dict(outcome) for _ in unit['batch']]
+        return [{'success': success} for success in unit['results']]
+
+    def deliver(self, message):
+        """Send one queued message through its channel. Returns True on success."""
+        channel = self.channels.get(message['channel'])
+        if channel is None:
+            logger.error(f"Invalid notification channel: {message['channel']}")
+            return False
+        try:
+            return channel.send(message['recipient'], message['message'], **(message.get('kwargs') or {}))
+        except Exception as e:
+            logger.error(f"Notification error ({message['channel']}): {e}")
+            return False
+
+    def _build_messages(self, user, message, channels, **kwargs):
+        messages = []
         results = {}
         for channel_name in channels:
             if channel_name not in self.channels:
@@ -187,23 +370,45 @@ class NotificationService:
                 results[channel_name] = {'success': False, 'error': 'No recipient'}
                 logger.warning(f"No recipient found for {channel_name} notification")
                 continue
-            
-            try:
-                success = self.channels[channel_name].send(recipient, message, **kwargs)
-                results[channel_name] = {'success': success}
-            except Exception as e:
-                results[channel_name] = {'success': False, 'error': str(e)}
-                logger.error(f"Notification error ({channel_name}): {e}")
+
+            messages.append({
+                'channel': channel_name,
+                'recipient': recipient,
+                'message': message,
+                'kwargs': kwargs,
+            })
+        return messages, results
+
+    def notify(self, user, message, channels=None, **kwargs):
+        """
+        Send notification to user via specified channels.
         
-        return results
+        Args:
+            user: User object with email/phone_number attributes
+            message: Notification message
+            channels: List of channels ['email', 'sms', 'whatsapp']
+            **kwargs: Additional params (subject, html_message, etc.)
+        """
+        if channels is None:
+            channels = ['email']
 
+        messages, results = self._build_messages(user, message, channels, **kwargs)
+        for result in self._dispatch(messages):
+            results[result['channel']] = {k: v for k, v in result.items() if k not in ('channel', 'recipient')}
+        
         return results
 
+    def _admin_message(self, message):
+        admin_phone = getattr(settings, 'ADMIN_PHONE_NUMBER', None)
+        if not admin_phone:
+            return None
+        return {'channel': 'sms', 'recipient': admin_phone, 'message': message}
+
     def notify_admin(self, message):
         """Notify admin phone number."""
-        admin_phone = getattr(settings, 'ADMIN_PHONE_NUMBER', None)
-        if admin_phone:
-            return self.channels['sms'].send(admin_phone, message)
+        admin_message = self._admin_message(message)
+        if admin_message:
+            return self._dispatch([admin_message])[0]['success']
         return False
 
     def notify_order_placed(self, user, order_doc):
@@ -212,37 +417,38 @@ class NotificationService:
         total = order_doc.get('total_price')
         
         # Notify Customer
-        self.notify(
+        messages, _ = self._build_messages(
             user,
             f"Your Abba order {order_id} has been placed successfully! Total: GH₵{total}. We'll notify you when a rider is assigned.",
-            channels=['sms']
+            ['sms']
         )
         
         # Notify Admin
         admin_msg = f"🔔 New Order Placed!\nID: {order_id}\nCustomer: {user.username}\nTotal: GH₵{total}\nLocation: {order_doc.get('pickup_location')}"
-        self.notify_admin(admin_msg)
+        admin_message = self._admin_message(admin_msg)
+        if admin_message:
+            messages.append(admin_message)
         
-        return True
+        return group_by_recipient(self._dispatch(messages))
 
     def notify_rider_assigned(self, customer, rider, order_id):
         """Notify customer and rider of assignment."""
         # Notify Customer
-        self.notify(
+        customer_messages, _ = self._build_messages(
             customer,
             f"A rider ({rider.first_name}) has been assigned to your order {order_id}. You can track their details in your history.",
-            channels=['sms']
+            ['sms']
         )
         
         # Notify Rider
-        self.notify(
+        rider_messages, _ = self._build_messages(
             rider,
             f"New Task Assigned! Please check your dashboard for order {order_id} and accept it to proceed.",
-            channels=['sms']
+            ['sms']
         )
-        return True
+        return group_by_recipient(self._dispatch(customer_messages + rider_messages))
 
-    def notify_order_status(self, user, order_id, status_code):
-        """Notify user of order status change."""
+    def _status_message(self, order_id, status_code):
         messages = {
             'ACCEPTED': f"Great news! Your order {order_id} has been accepted. A rider will pick it up soon.",
             'PICKED_UP': f"Your order {order_id} has been picked up by our rider. We're on it!",
@@ -250,8 +456,23 @@ class NotificationService:
             'READY': f"Your order {order_id} is ready for delivery! Our rider will arrive shortly.",
             'DELIVERED': f"Your order {order_id} has been delivered. Thank you for choosing Abba EZWash! Luxury clean, delivered."
         }
-        message = messages.get(status_code, f"Order {order_id} status updated to: {status_code}")
-        return self.notify(user, message, channels=['sms'])
+        return messages.get(status_code, f"Order {order_id} status updated to: {status_code}")
+
+    def notify_order_status(self, user, order_id, status_code):
+        """Notify user of order status change."""
+        return self.notify(user, self._status_message(order_id, status_code), channels=['sms'])
+
+    def notify_order_statuses(self, updates):
+        """
+        Notify several users of order status changes in one batch.
+
+        `updates` is an iterable of (user, order_id, status_code) tuples.
+        """
+        messages = []
+        for user, order_id, status_code in updates:
+            user_messages, _ = self._build_messages(user, self._status_message(order_id, status_code), ['sms'])
+            messages.extend(user_messages)
+        return self._dispatch(messages)
 
 
 # Singleton instance
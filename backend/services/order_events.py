@@ -0,0 +1,196 @@
+"""
+Order Status Event Bus
+
+Feeds the server-sent events endpoint (see core/events.py) so customers,
+riders and admins are pushed one small event per order transition instead of
+polling:
+- In-process pub/sub: each SSE connection registers an asyncio queue under
+  the channels it may see (`user:<id>`, `rider:<id>`, `admin`)
+- With ORDER_EVENTS_CHANGE_STREAM on, a background thread per process tails
+  a MongoDB change stream on `orders`, so transitions made by any worker or
+  process reach every subscriber (requires a replica set, e.g. Atlas). The
+  previous status comes from the status_history entry the update pushed
+- Rider (re)assignments that keep the status are published too, with
+  `previous_status` equal to `status`
+- Otherwise `publish_transition()` is called by the order state machine and
+  only reaches subscribers connected to the same process
+- Slow consumers never block publishers: a full queue drops the event
+"""
+import asyncio
+import logging
+import threading
+import time
+from django.conf import settings
+from services.mongo_service import mongo_service
+
+logger = logging.getLogger(__name__)
+
+ADMIN_CHANNEL = 'admin'
+
+# Stream tickets (services/stream_tickets.py) are only valid for this stream
+TICKET_PURPOSE = 'order_events'
+
+# Orders are created in this status without a status_history entry
+INITIAL_STATUS = 'PENDING'
+
+# Order fields a change stream update carries that the event is built from
+EVENT_FIELDS = ['status', 'assigned_rider_id', 'updated_at']
+
+
+def channels_for(order):
+    """Channels that should receive events about `order`."""
+    channels = [ADMIN_CHANNEL]
+    if order.get('user_id'):
+        channels.append(f"user:{order['user_id']}")
+    if order.get('assigned_rider_id'):
+        channels.append(f"rider:{order['assigned_rider_id']}")
+    return channels
+
+
+def build_event(order, previous_status=None):
+    updated_at = order.get('updated_at')
+    return {
+        'order_id': order.get('order_id'),
+        'status': order.get('status'),
+        'previous_status': previous_status,
+        'assigned_rider_id': order.get('assigned_rider_id'),
+        'updated_at': updated_at.isoformat() if hasattr(updated_at, 'isoformat') else updated_at,
+    }
+
+
+def _previous_status(order, updated_fields):
+    """Status before a status update, read from the status_history entry the update pushed."""
+    if 'status_history' in updated_fields:
+        # $push onto a missing array reports the whole new array
+        position = len(updated_fields['status_history']) - 1
+    else:
+        positions = [
+            int(field.split('.')[1]) for field in updated_fields
+            if field.startswith('status_history.') and field.split('.')[1].isdigit()
+        ]
+        if not positions:
+            return None
+        position = max(positions)
+    if position == 0:
+        return INITIAL_STATUS
+    history = order.get('status_history') or []
+    if position - 1 < len(history):
+        return history[position - 1].get('status')
+    return None
+
+
+def event_from_change(change):
+    """Return (event, channels) for an `orders` change stream update, or None if the order is gone."""
+    order = change.get('fullDocument')
+    if not order:
+        return None
+    updated_fields = change.get('updateDescription', {}).get('updatedFields', {})
+    # fullDocument is looked up after the fact and may already include later
+    # writes, so the fields this update set take precedence
+    order = {**order, **{field: updated_fields[field] for field in EVENT_FIELDS if field in updated_fields}}
+    if 'status' in updated_fields:
+        previous_status = _previous_status(order, updated_fields)
+    else:
+        previous_status = order.get('status')
+    return build_event(order, previous_status), channels_for(order)
+
+
+class Subscription:
+    def __init__(self, bus, channels, loop, max_queue):
+        self.bus = bus
+        self.channels = set(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def _offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Dropping order event for slow subscriber on {sorted(self.channels)}")
+
+    def deliver(self, event):
+        # Called from any thread; the queue belongs to the subscriber's event loop
+        self.loop.call_soon_threadsafe(self._offer, event)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class OrderEventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._watcher = None
+
+    @property
+    def use_change_stream(self):
+        return getattr(settings, 'ORDER_EVENTS_CHANGE_STREAM', False)
+
+    @property
+    def max_queue(self):
+        return getattr(settings, 'ORDER_EVENTS_QUEUE_SIZE', 100)
+
+    def subscribe(self, channels):
+        """Register a subscriber on the running event loop. Returns a Subscription."""
+        subscription = Subscription(self, channels, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        if self.use_change_stream:
+            self._ensure_watcher()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event, channels):
+        channels = set(channels)
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.channels & channels]
+        for subscription in targets:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def publish_transition(self, order, previous_status=None):
+        """Announce a transition made by this process (no-op when the change stream is the source)."""
+        if self.use_change_stream:
+            return
+        self.publish(build_event(order, previous_status), channels_for(order))
+
+    # -- change stream ------------------------------------------------------
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, name='order-events', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        pipeline = [{'$match': {
+            'operationType': 'update',
+            '$or': [
+                {'updateDescription.updatedFields.status': {'$exists': True}},
+                {'updateDescription.updatedFields.assigned_rider_id': {'$exists': True}},
+            ],
+        }}]
+        resume_token = None
+        while True:
+            try:
+                collection = mongo_service.get_collection('orders')
+                with collection.watch(pipeline, full_document='updateLookup', resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        built = event_from_change(change)
+                        if built:
+                            self.publish(*built)
+            except Exception as e:
+                logger.error(f"Order change stream failed, retrying: {e}")
+                time.sleep(5)
+
+
+# Singleton instance
+order_event_bus = OrderEventBus()
@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination for MongoDB collections
+
+Pages are walked newest-first on `created_at` with `_id` as a tie-breaker, so
+each page is an indexed range scan no matter how deep the client goes.
+The cursor handed to clients is an opaque URL-safe token.
+"""
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from pymongo import DESCENDING
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class MongoCursorPaginator:
+    """Paginate a Mongo query by (sort_field, _id) descending."""
+
+    def __init__(self, sort_field='created_at', default_page_size=None, max_page_size=None):
+        self.sort_field = sort_field
+        self.default_page_size = default_page_size or getattr(settings, 'MONGO_PAGE_SIZE', 50)
+        self.max_page_size = max_page_size or getattr(settings, 'MONGO_MAX_PAGE_SIZE', 200)
+
+    def encode_cursor(self, doc):
+        value = doc.get(self.sort_field)
+        payload = {
+            'v': value.isoformat() if isinstance(value, datetime) else value,
+            'id': str(doc['_id']),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = payload['v']
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            return value, ObjectId(payload['id'])
+        except (ValueError, KeyError, TypeError, InvalidId) as e:
+            raise InvalidCursor('Invalid cursor') from e
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', self.default_page_size))
+        except (TypeError, ValueError):
+            page_size = self.default_page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate(self, collection, query, request, projection=None):
+        """
+        Fetch one page of `query` from `collection`.
+
+        Returns (documents, next_cursor). `next_cursor` is None on the last page.
+        Raises InvalidCursor if the `cursor` query param cannot be decoded.
+        """
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get('cursor')
+
+        if cursor:
+            value, last_id = self.decode_cursor(cursor)
+            query = {
+                '$and': [
+                    query,
+                    {'$or': [
+                        {self.sort_field: {'$lt': value}},
+                        {self.sort_field: value, '_id': {'$lt': last_id}},
+                    ]},
+                ]
+            }
+
+        docs = list(
+            collection.find(query, projection)
+            .sort([(self.sort_field, DESCENDING), ('_id', DESCENDING)])
+            .limit(page_size + 1)
+        )
+
+        next_cursor = None
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            next_cursor = self.encode_cursor(docs[-1])
+
+        return docs, next_cursor
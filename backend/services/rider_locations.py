@@ -0,0 +1,229 @@
+"""
+Rider Location Ingestion
+
+Riders report their position every few seconds, so pings no longer go
+straight to Postgres. Each batch of pings costs one read and at most one
+write on the hot store, plus one insert for the track:
+- Hot store: `rider_locations` holds one document per rider (`_id` is the
+  rider id) with the latest position. A batch is coalesced to its newest
+  ping, and a rider who has not moved LOCATION_MIN_DISTANCE metres is only
+  rewritten every LOCATION_MAX_SILENCE seconds
+- Track: `rider_tracks` (a MongoDB time-series collection) keeps at most one
+  point per LOCATION_TRACK_INTERVAL seconds per rider
+- Postgres: RiderProfile.current_location and User.location are refreshed at
+  most every LOCATION_PERSIST_INTERVAL seconds, and on `persist()` when the
+  rider goes offline. API readers (UserSerializer, the available riders
+  list) take the position from `get_latest()` instead
+- The single-location form may also carry a plain value such as an address
+  string (see `normalize_location()`); it is stored as sent
+"""
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from pymongo.errors import DuplicateKeyError
+from services.mongo_service import mongo_service
+
+logger = logging.getLogger(__name__)
+
+HOT_COLLECTION = 'rider_locations'
+TRACK_COLLECTION = 'rider_tracks'
+
+# Pings stamped further in the future than this are clamped to the server time
+MAX_CLOCK_SKEW = timedelta(seconds=60)
+
+
+class InvalidPing(ValueError):
+    pass
+
+
+def _parse_timestamp(value, now):
+    if value is None:
+        return now
+    try:
+        if isinstance(value, (int, float)):
+            # Epoch milliseconds, as sent by browser geolocation
+            moment = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        else:
+            moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise InvalidPing(f"Invalid timestamp: {value}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(moment, now + MAX_CLOCK_SKEW)
+
+
+def normalize_pings(pings, now=None):
+    """
+    Validate raw pings and return them as (recorded_at, location) sorted oldest first.
+
+    A ping is a location object with an optional `timestamp` (ISO 8601 or
+    epoch milliseconds); the remaining keys are stored as the location.
+    """
+    now = now or datetime.utcnow()
+    normalized = []
+    for index, ping in enumerate(pings):
+        if not isinstance(ping, dict) or not ping:
+            raise InvalidPing(f"Ping {index} must be a location object")
+        location = {key: value for key, value in ping.items() if key != 'timestamp'}
+        if not location:
+            raise InvalidPing(f"Ping {index} has no location")
+        try:
+            recorded_at = _parse_timestamp(ping.get('timestamp'), now)
+        except InvalidPing as e:
+            raise InvalidPing(f"Ping {index}: {e}")
+        normalized.append((recorded_at, location))
+    normalized.sort(key=lambda ping: ping[0])
+    return normalized
+
+
+def normalize_location(location, now=None):
+    """
+    Normalize the single {"location": ...} form into pings.
+
+    A location object is validated like a ping. Any other value (e.g. an
+    address string) was accepted before pings were batched, so it is kept as
+    sent and stamped with the server time.
+    """
+    if isinstance(location, dict):
+        return normalize_pings([location], now)
+    return [(now or datetime.utcnow(), location)]
+
+
+def _coordinates(location):
+    if not isinstance(location, dict):
+        return None
+    lat = location.get('lat', location.get('latitude'))
+    lng = location.get('lng', location.get('longitude'))
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+
+
+def distance_metres(a, b):
+    """Great-circle distance between two locations, or None if either lacks coordinates."""
+    a, b = _coordinates(a or {}), _coordinates(b or {})
+    if a is None or b is None:
+        return None
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+class RiderLocationStore:
+    @property
+    def hot(self):
+        return mongo_service.get_collection(HOT_COLLECTION)
+
+    @property
+    def tracks(self):
+        return mongo_service.get_collection(TRACK_COLLECTION)
+
+    def _setting(self, name, default):
+        return getattr(settings, name, default)
+
+    def _is_stationary(self, current, recorded_at, location):
+        """True when the new position is close enough to the stored one to skip the write."""
+        if not current.get('recorded_at'):
+            return False
+        silence = timedelta(seconds=self._setting('LOCATION_MAX_SILENCE', 30))
+        if recorded_at - current['recorded_at'] >= silence:
+            return False
+        moved = distance_metres(current.get('location'), location)
+        return moved is not None and moved < self._setting('LOCATION_MIN_DISTANCE', 10)
+
+    def _downsample(self, rider_id, pings, track_at):
+        interval = timedelta(seconds=self._setting('LOCATION_TRACK_INTERVAL', 30))
+        points = []
+        for recorded_at, location in pings:
+            if track_at is None or recorded_at - track_at >= interval:
+                points.append({'rider_id': rider_id, 'timestamp': recorded_at, 'location': location})
+                track_at = recorded_at
+        return points
+
+    def _write_postgres(self, rider_id, location):
+        # Queryset updates: no model save(), signals or profile round trips
+        from users.models import RiderProfile
+        User = get_user_model()
+        RiderProfile.objects.filter(user_id=rider_id).update(current_location=location)
+        User.objects.filter(pk=rider_id).update(location=location)
+
+    def ingest(self, rider_id, pings):
+        """
+        Record a batch of normalized pings for a rider.
+
+        Returns a dict with `latest` (the stored position), `tracked` (points
+        appended to the track) and `persisted` (whether Postgres was updated).
+        """
+        rider_id = str(rider_id)
+        now = datetime.utcnow()
+        current = self.hot.find_one(
+            {'_id': rider_id},
+            {'location': 1, 'recorded_at': 1, 'track_at': 1, 'persisted_at': 1}
+        ) or {}
+
+        points = self._downsample(rider_id, pings, current.get('track_at'))
+        if points:
+            self.tracks.insert_many(points)
+
+        fields = {}
+        if points:
+            fields['track_at'] = points[-1]['timestamp']
+
+        recorded_at, location = pings[-1]
+        stored_at = current.get('recorded_at')
+        is_newer = stored_at is None or recorded_at > stored_at
+        if is_newer and not self._is_stationary(current, recorded_at, location):
+            fields.update({'location': location, 'recorded_at': recorded_at, 'updated_at': now, 'dirty': True})
+
+        persisted = False
+        persist_interval = timedelta(seconds=self._setting('LOCATION_PERSIST_INTERVAL', 300))
+        persisted_at = current.get('persisted_at')
+        if 'location' in fields and (persisted_at is None or now - persisted_at >= persist_interval):
+            self._write_postgres(rider_id, location)
+            fields.update({'persisted_at': now, 'dirty': False})
+            persisted = True
+
+        if fields:
+            try:
+                # Compare-and-set on the position we read, so an older batch
+                # that lands late never overwrites a newer one
+                self.hot.update_one({'_id': rider_id, 'recorded_at': stored_at}, {'$set': fields}, upsert=True)
+            except DuplicateKeyError:
+                logger.info(f"Concurrent location update for rider {rider_id}; keeping the newer position")
+
+        return {
+            'latest': {
+                'location': fields.get('location', current.get('location')),
+                'recorded_at': fields.get('recorded_at', stored_at),
+            },
+            'tracked': len(points),
+            'persisted': persisted,
+        }
+
+    def get_latest(self, rider_ids):
+        """Latest known position per rider id, from the hot store."""
+        cursor = self.hot.find(
+            {'_id': {'$in': [str(rider_id) for rider_id in rider_ids]}},
+            {'location': 1, 'recorded_at': 1}
+        )
+        return {doc['_id']: doc for doc in cursor}
+
+    def persist(self, rider_id):
+        """Write the rider's latest position to Postgres if it has not been yet."""
+        rider_id = str(rider_id)
+        current = self.hot.find_one({'_id': rider_id, 'dirty': True}, {'location': 1, 'recorded_at': 1})
+        if not current:
+            return False
+        self._write_postgres(rider_id, current['location'])
+        self.hot.update_one(
+            {'_id': rider_id, 'recorded_at': current['recorded_at']},
+            {'$set': {'persisted_at': datetime.utcnow(), 'dirty': False}}
+        )
+        return True
+
+
+# Singleton instance
+rider_location_store = RiderLocationStore()
@@ -0,0 +1,115 @@
+"""
+Rider Statistics
+
+The rider app polls its counters, so they are computed with a single
+MongoDB aggregation and cached per rider for RIDER_STATS_CACHE_TTL seconds:
+- Assigned / picked up / delivered totals
+- Value of delivered orders, deliveries today and over the last 7 days
+The cache lives in the `rider_stats_cache` collection, so every worker
+process sees the same entries. Views that move an order through a rider's
+hands call `invalidate()`, which bumps the rider's `generation` so the
+rider sees the change on the next poll whichever worker serves it. A compute
+that raced with an invalidation is not cached.
+"""
+import logging
+from datetime import datetime, timedelta
+from django.conf import settings
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from services.mongo_service import mongo_service
+
+logger = logging.getLogger(__name__)
+
+PICKED_UP_STATUSES = ['PICKED_UP', 'CLEANING', 'READY', 'DELIVERED']
+
+
+def _cache_collection():
+    return mongo_service.get_collection('rider_stats_cache')
+
+
+def _cache_ttl():
+    return getattr(settings, 'RIDER_STATS_CACHE_TTL', 30)
+
+
+def compute(rider_id):
+    """Compute every rider counter in one aggregation."""
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=6)
+
+    is_delivered = {'$eq': ['$status', 'DELIVERED']}
+
+    def delivered_since(moment):
+        return {'$sum': {'$cond': [{'$and': [is_delivered, {'$gte': ['$delivered_at', moment]}]}, 1, 0]}}
+
+    pipeline = [
+        {'$match': {'assigned_rider_id': str(rider_id)}},
+        {'$group': {
+            '_id': None,
+            'total_assigned': {'$sum': 1},
+            'total_picked_up': {'$sum': {'$cond': [{'$in': ['$status', PICKED_UP_STATUSES]}, 1, 0]}},
+            'total_delivered': {'$sum': {'$cond': [is_delivered, 1, 0]}},
+            'delivered_value': {'$sum': {'$cond': [is_delivered, '$total_price', 0]}},
+            'delivered_today': delivered_since(today),
+            'delivered_this_week': delivered_since(week_start),
+        }},
+        {'$project': {'_id': 0}},
+    ]
+
+    collection = mongo_service.get_collection('orders')
+    rows = list(collection.aggregate(pipeline))
+    if rows:
+        return rows[0]
+    return {
+        'total_assigned': 0,
+        'total_picked_up': 0,
+        'total_delivered': 0,
+        'delivered_value': 0,
+        'delivered_today': 0,
+        'delivered_this_week': 0,
+    }
+
+
+def get(rider_id):
+    """Return the rider's counters, from cache when possible."""
+    rider_id = str(rider_id)
+    collection = _cache_collection()
+    now = datetime.utcnow()
+
+    entry = collection.find_one({'_id': rider_id}) or {}
+    computed_at = entry.get('computed_at')
+    if entry.get('stats') is not None and computed_at and now - computed_at < timedelta(seconds=_cache_ttl()):
+        return entry['stats']
+
+    stats = compute(rider_id)
+    try:
+        # Only store the result if no invalidation happened while computing
+        collection.update_one(
+            {'_id': rider_id, 'generation': entry.get('generation', 0)},
+            {'$set': {'stats': stats, 'computed_at': now, 'updated_at': now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to cache rider stats: {e}")
+    return stats
+
+
+def invalidate(*rider_ids):
+    """Drop cached counters for the given riders (falsy ids are ignored)."""
+    rider_ids = {str(rider_id) for rider_id in rider_ids if rider_id}
+    if not rider_ids:
+        return
+    now = datetime.utcnow()
+    try:
+        _cache_collection().bulk_write([
+            UpdateOne(
+                {'_id': rider_id},
+                {'$inc': {'generation': 1}, '$unset': {'stats': ''}, '$set': {'updated_at': now}},
+                upsert=True
+            )
+            for rider_id in rider_ids
+        ], ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to invalidate rider stats cache: {e}")
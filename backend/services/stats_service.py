@@ -0,0 +1,303 @@
+"""
+Dashboard Statistics
+
+Shared by AdminStatsView and SystemStatsView:
+- Order counts and revenue per status in one MongoDB aggregation
+  (reviews and complaints counts are folded into the same pipeline)
+- User counts per role in one GROUP BY query
+- Materialized `stats_counters` updated incrementally by the order views
+"""
+import logging
+from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from pymongo import ReplaceOne, UpdateOne
+from services.mongo_service import mongo_service
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUSES = ['PENDING', 'ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'CLEANING', 'READY', 'DELIVERED', 'CANCELLED']
+IN_PROGRESS_STATUSES = ['ASSIGNED', 'ACCEPTED', 'PICKED_UP', 'CLEANING', 'READY']
+USER_ROLES = ['CUSTOMER', 'RIDER', 'AMBASSADOR', 'ADMIN', 'SUPER_ADMIN']
+
+_REVIEWS_KEY = '__reviews__'
+_COMPLAINTS_KEY = '__complaints__'
+
+
+def get_order_stats():
+    """
+    Count orders and sum revenue per status, plus review and complaint totals.
+
+    Returns a dict with:
+        by_status: {status: count} for every known status
+        total_orders, total_revenue, delivered_revenue, reviews, complaints
+    """
+    collection = mongo_service.get_collection('orders')
+    pipeline = [
+        {'$group': {
+            '_id': '$status',
+            'count': {'$sum': 1},
+            'revenue': {'$sum': '$total_price'},
+        }},
+        {'$unionWith': {
+            'coll': 'reviews',
+            'pipeline': [{'$group': {'_id': _REVIEWS_KEY, 'count': {'$sum': 1}}}],
+        }},
+        {'$unionWith': {
+            'coll': 'complaints',
+            'pipeline': [{'$group': {'_id': _COMPLAINTS_KEY, 'count': {'$sum': 1}}}],
+        }},
+    ]
+
+    stats = {
+        'by_status': {s: 0 for s in ORDER_STATUSES},
+        'total_orders': 0,
+        'total_revenue': 0,
+        'delivered_revenue': 0,
+        'reviews': 0,
+        'complaints': 0,
+    }
+
+    for row in collection.aggregate(pipeline):
+        key = row['_id']
+        if key == _REVIEWS_KEY:
+            stats['reviews'] = row['count']
+        elif key == _COMPLAINTS_KEY:
+            stats['complaints'] = row['count']
+        else:
+            if key is not None:
+                stats['by_status'][key] = stats['by_status'].get(key, 0) + row['count']
+            stats['total_orders'] += row['count']
+            stats['total_revenue'] += row.get('revenue') or 0
+            if key == 'DELIVERED':
+                stats['delivered_revenue'] += row.get('revenue') or 0
+
+    return stats
+
+
+def get_user_role_counts():
+    """Return {role: count} for every role in a single query."""
+    User = get_user_model()
+    counts = {role: 0 for role in USER_ROLES}
+    rows = User.objects.order_by().values('role').annotate(count=Count('id'))
+    for row in rows:
+        counts[row['role']] = row['count']
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Materialized counters
+#
+# `stats_counters` holds one `global` document plus one `day:YYYY-MM-DD`
+# document per day. Views that change order state bump them with `$inc` so the
+# dashboards read a single document instead of rescanning orders. Counter
+# writes never fail the request; `manage.py rebuild_stats_counters` reconciles
+# any drift.
+#
+# `$inc` upserts the `global` document, so its mere existence says nothing
+# about whether it covers orders created before the counters were deployed.
+# Only `rebuild_counters()` writes `bootstrapped_at`; until it is present the
+# counters are rebuilt from the source collections on read.
+# ---------------------------------------------------------------------------
+
+GLOBAL_COUNTERS_ID = 'global'
+
+
+def _day_id(moment):
+    return f"day:{moment.strftime('%Y-%m-%d')}"
+
+
+def _day_expr(field):
+    return {'$dateToString': {'format': '%Y-%m-%d', 'date': field}}
+
+
+def _counters_collection():
+    return mongo_service.get_collection('stats_counters')
+
+
+def _apply_counter_updates(updates):
+    """Apply (doc_id, inc) pairs in one round trip, logging instead of raising."""
+    now = datetime.utcnow()
+    requests = []
+    for doc_id, inc in updates:
+        if not inc:
+            continue
+        update = {'$inc': inc, '$set': {'updated_at': now}}
+        if doc_id.startswith('day:'):
+            update['$setOnInsert'] = {'date': doc_id[len('day:'):]}
+        requests.append(UpdateOne({'_id': doc_id}, update, upsert=True))
+    if not requests:
+        return
+    try:
+        _counters_collection().bulk_write(requests, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to update stats counters: {e}")
+
+
+def record_order_created(order_doc):
+    total_price = order_doc.get('total_price') or 0
+    created_at = order_doc.get('created_at') or datetime.utcnow()
+    _apply_counter_updates([
+        (GLOBAL_COUNTERS_ID, {
+            'orders.total': 1,
+            f"orders.{order_doc.get('status', 'PENDING')}": 1,
+            'revenue.total': total_price,
+        }),
+        (_day_id(created_at), {'orders': 1, 'revenue': total_price}),
+    ])
+
+
+def record_status_changes(changes):
+    """
+    Record order status transitions.
+
+    `changes` is an iterable of (old_status, new_status, total_price) tuples.
+    All transitions are folded into a single bulk write.
+    """
+    global_inc = {}
+    day_inc = {}
+
+    def bump(target, key, amount):
+        target[key] = target.get(key, 0) + amount
+
+    for old_status, new_status, total_price in changes:
+        if old_status == new_status:
+            continue
+        total_price = total_price or 0
+        if old_status:
+            bump(global_inc, f'orders.{old_status}', -1)
+        bump(global_inc, f'orders.{new_status}', 1)
+        bump(day_inc, f'status_changes.{new_status}', 1)
+
+        if new_status == 'DELIVERED':
+            bump(global_inc, 'revenue.delivered', total_price)
+            bump(day_inc, 'delivered', 1)
+            bump(day_inc, 'delivered_revenue', total_price)
+        elif old_status == 'DELIVERED':
+            bump(global_inc, 'revenue.delivered', -total_price)
+
+    _apply_counter_updates([
+        (GLOBAL_COUNTERS_ID, global_inc),
+        (_day_id(datetime.utcnow()), day_inc),
+    ])
+
+
+def record_status_change(old_status, new_status, total_price=0):
+    record_status_changes([(old_status, new_status, total_price)])
+
+
+def record_review_created():
+    _apply_counter_updates([(GLOBAL_COUNTERS_ID, {'reviews': 1})])
+
+
+def record_complaint_created():
+    _apply_counter_updates([(GLOBAL_COUNTERS_ID, {'complaints': 1})])
+
+
+def rebuild_counters():
+    """Recompute every counter document from the source collections."""
+    stats = get_order_stats()
+    now = datetime.utcnow()
+    collection = _counters_collection()
+
+    global_doc = {
+        'orders': {'total': stats['total_orders'], **stats['by_status']},
+        'revenue': {'total': stats['total_revenue'], 'delivered': stats['delivered_revenue']},
+        'reviews': stats['reviews'],
+        'complaints': stats['complaints'],
+        'updated_at': now,
+        'bootstrapped_at': now,
+    }
+    collection.replace_one({'_id': GLOBAL_COUNTERS_ID}, global_doc, upsert=True)
+
+    days = {}
+    orders = mongo_service.get_collection('orders')
+
+    created = orders.aggregate([
+        {'$match': {'created_at': {'$type': 'date'}}},
+        {'$group': {
+            '_id': _day_expr('$created_at'),
+            'orders': {'$sum': 1},
+            'revenue': {'$sum': '$total_price'},
+        }},
+    ])
+    for row in created:
+        days.setdefault(row['_id'], {})
+        days[row['_id']].update(orders=row['orders'], revenue=row['revenue'])
+
+    delivered = orders.aggregate([
+        {'$match': {'status': 'DELIVERED', 'delivered_at': {'$type': 'date'}}},
+        {'$group': {
+            '_id': _day_expr('$delivered_at'),
+            'delivered': {'$sum': 1},
+            'delivered_revenue': {'$sum': '$total_price'},
+        }},
+    ])
+    for row in delivered:
+        days.setdefault(row['_id'], {})
+        days[row['_id']].update(delivered=row['delivered'], delivered_revenue=row['delivered_revenue'])
+
+    transitions = orders.aggregate([
+        {'$unwind': '$status_history'},
+        {'$match': {'status_history.timestamp': {'$type': 'date'}}},
+        {'$group': {
+            '_id': {
+                'day': _day_expr('$status_history.timestamp'),
+                'status': '$status_history.status',
+            },
+            'count': {'$sum': 1},
+        }},
+    ])
+    for row in transitions:
+        if not row['_id'].get('status'):
+            continue
+        day = days.setdefault(row['_id']['day'], {})
+        day.setdefault('status_changes', {})[row['_id']['status']] = row['count']
+
+    day_ids = [f'day:{day}' for day in days]
+    if days:
+        collection.bulk_write([
+            ReplaceOne({'_id': f'day:{day}'}, {'date': day, **values, 'updated_at': now}, upsert=True)
+            for day, values in days.items()
+        ], ordered=False)
+    collection.delete_many({'_id': {'$regex': '^day:', '$nin': day_ids}})
+
+    return global_doc
+
+
+def get_dashboard_counters():
+    """
+    Read the materialized counters in the same shape as `get_order_stats`.
+
+    Rebuilds them on first use (e.g. right after deploy), including when
+    `$inc` writes have already created a partial document.
+    """
+    doc = _counters_collection().find_one({'_id': GLOBAL_COUNTERS_ID})
+    if doc is None or 'bootstrapped_at' not in doc:
+        doc = rebuild_counters()
+
+    order_counts = doc.get('orders', {})
+    revenue = doc.get('revenue', {})
+    by_status = {s: 0 for s in ORDER_STATUSES}
+    for key, value in order_counts.items():
+        if key != 'total':
+            by_status[key] = value
+
+    return {
+        'by_status': by_status,
+        'total_orders': order_counts.get('total', 0),
+        'total_revenue': revenue.get('total', 0),
+        'delivered_revenue': revenue.get('delivered', 0),
+        'reviews': doc.get('reviews', 0),
+        'complaints': doc.get('complaints', 0),
+    }
+
+
+def get_daily_counters(days=7):
+    """Return the per-day counter documents for the last `days` days, oldest first."""
+    since = _day_id(datetime.utcnow() - timedelta(days=days - 1))
+    docs = _counters_collection().find(
+        {'_id': {'$gte': since, '$regex': '^day:'}},
+        {'_id': 0, 'updated_at': 0},
+    ).sort('_id', 1)
+    return list(docs)
@@ -0,0 +1,56 @@
+"""
+Stream Ticket Store
+
+Browsers cannot set headers on an EventSource, so a streaming endpoint can
+only be authenticated through its URL, which ends up in proxy and access
+logs. Instead of a bearer token, the client first POSTs (with its JWT) for a
+ticket and opens the stream with `?ticket=`:
+- A ticket is a random string stored in the `stream_tickets` MongoDB
+  collection (as the document `_id`) with its user and purpose
+- It is good for one purpose (e.g. `order_events`) and one use: redeeming
+  deletes it, so a ticket copied from a log is already spent
+- It expires after STREAM_TICKET_TTL seconds (TTL index on expires_at cleans
+  up tickets that were never redeemed)
+"""
+import secrets
+from datetime import datetime, timedelta
+from django.conf import settings
+from services.mongo_service import mongo_service
+
+
+class StreamTicketStore:
+    COLLECTION = 'stream_tickets'
+
+    @property
+    def collection(self):
+        return mongo_service.get_collection(self.COLLECTION)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'STREAM_TICKET_TTL', 30)
+
+    def issue(self, user_id, purpose):
+        """Create a ticket letting `user_id` open one `purpose` stream. Returns the ticket."""
+        now = datetime.utcnow()
+        ticket = secrets.token_urlsafe(32)
+        self.collection.insert_one({
+            '_id': ticket,
+            'user_id': str(user_id),
+            'purpose': purpose,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=self.ttl),
+        })
+        return ticket
+
+    def redeem(self, ticket, purpose):
+        """Spend `ticket`. Returns its user ID, or None if it is unknown, expired, spent or for another purpose."""
+        record = self.collection.find_one_and_delete({
+            '_id': ticket,
+            'purpose': purpose,
+            'expires_at': {'$gt': datetime.utcnow()},
+        })
+        return record['user_id'] if record else None
+
+
+# Singleton instance
+stream_ticket_store = StreamTicketStore()
@@ -0,0 +1,46 @@
+"""
+Test Helpers for MongoDB-backed Code
+
+MongoTestCase points the `mongo_service` singleton at a throwaway database
+for the duration of a test class:
+- The database is `<MONGO_DB_NAME>_test` on the configured MONGO_URI
+- Every collection is dropped after each test, the database after the class
+- The in-process caches (catalog lookups, public catalog and reviews
+  responses) are reset before each test, so nothing leaks between tests
+- Tests are skipped when no MongoDB server is reachable
+"""
+from unittest import SkipTest
+from django.conf import settings
+from django.test import TestCase
+from orders.views import public_catalog_cache, public_reviews_cache
+from services.catalog_cache import catalog_cache
+from services.mongo_service import mongo_service
+
+
+class MongoTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Checked before TestCase opens its transactions, which a skip would leave open
+        if not mongo_service._connect():
+            raise SkipTest('MongoDB is not reachable')
+        cls._saved_db = mongo_service._db
+        cls.mongo_db = mongo_service._client[f'{settings.MONGO_DB_NAME}_test']
+        mongo_service._db = cls.mongo_db
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        mongo_service._client.drop_database(cls.mongo_db.name)
+        mongo_service._db = cls._saved_db
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        catalog_cache.invalidate()
+        public_catalog_cache.invalidate()
+        public_reviews_cache.invalidate()
+
+    def tearDown(self):
+        for name in self.mongo_db.list_collection_names():
+            self.mongo_db.drop_collection(name)
+        super().tearDown()
@@ -1,23 +1,74 @@
-import os
 import logging
-from twilio.rest import Client
+import threading
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-class TwilioService:
-    def __init__(self):
-        self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-        self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        self.from_number = os.getenv('TWILIO_PHONE_NUMBER')
-        self.messaging_service_sid = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
-        self.client = None
-        
-        if self.account_sid and self.auth_token:
+_client = None
+_client_lock = threading.Lock()
+
+
+def _build_http_client():
+    """Twilio HTTP transport backed by one keep-alive connection pool."""
+    from requests.adapters import HTTPAdapter
+    from twilio.http.http_client import TwilioHttpClient
+    from urllib3.util.retry import Retry
+
+    http_client = TwilioHttpClient(
+        pool_connections=True,
+        timeout=getattr(settings, 'TWILIO_HTTP_TIMEOUT', 10),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,  # Every request goes to api.twilio.com
+        pool_maxsize=getattr(settings, 'TWILIO_HTTP_POOL_SIZE', 10),
+        # Only retry failures to connect: a POST that reached Twilio may already have sent the SMS
+        max_retries=Retry(
+            total=getattr(settings, 'TWILIO_HTTP_MAX_RETRIES', 2),
+            read=0,
+            status=0,
+            backoff_factor=0.5,
+        ),
+    )
+    http_client.session.mount('https://', adapter)
+    return http_client
+
+
+def get_twilio_client():
+    """
+    Return the process-wide Twilio client, creating it on first use.
+
+    SMSChannel, WhatsAppChannel and TwilioService all share it, so SMS bursts
+    reuse pooled TLS connections. Returns None if Twilio is not configured.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
+    auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
+    if not account_sid or not auth_token:
+        return None
+
+    with _client_lock:
+        if _client is None:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                from twilio.rest import Client
+                _client = Client(account_sid, auth_token, http_client=_build_http_client())
+            except ImportError:
+                logger.warning("Twilio package not installed. SMS/WhatsApp disabled.")
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {str(e)}")
+    return _client
+
+
+class TwilioService:
+    def __init__(self):
+        self.from_number = getattr(settings, 'TWILIO_PHONE_NUMBER', None)
+        self.messaging_service_sid = getattr(settings, 'TWILIO_MESSAGING_SERVICE_SID', None)
+
+    @property
+    def client(self):
+        return get_twilio_client()
 
     def _format_number(self, phone_number):
         """Ensure phone number is in E.164 format for Ghana."""
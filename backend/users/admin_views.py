@@ -13,11 +13,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
 from bson import ObjectId
 from bson.errors import InvalidId
 from users.permissions import IsAdmin, IsSuperAdmin
 from users.serializers import UserSerializer
 from services.mongo_service import mongo_service
+from services import stats_service
 
 User = get_user_model()
 
@@ -105,43 +107,32 @@ class SystemStatsView(APIView):
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        collection = mongo_service.get_collection('orders')
-        
         # User stats by role
-        user_stats = {}
-        for role in ['CUSTOMER', 'RIDER', 'AMBASSADOR', 'ADMIN', 'SUPER_ADMIN']:
-            user_stats[role.lower()] = User.objects.filter(role=role).count()
+        role_counts = stats_service.get_user_role_counts()
+        user_stats = {role.lower(): count for role, count in role_counts.items()}
 
         # Order stats
+        stats = stats_service.get_dashboard_counters()
+        by_status = stats['by_status']
         order_stats = {
-            'total': collection.count_documents({}),
-            'pending': collection.count_documents({'status': 'PENDING'}),
-            'accepted': collection.count_documents({'status': 'ACCEPTED'}),
-            'picked_up': collection.count_documents({'status': 'PICKED_UP'}),
-            'cleaning': collection.count_documents({'status': 'CLEANING'}),
-            'ready': collection.count_documents({'status': 'READY'}),
-            'delivered': collection.count_documents({'status': 'DELIVERED'}),
-            'cancelled': collection.count_documents({'status': 'CANCELLED'}),
+            'total': stats['total_orders'],
+            'pending': by_status['PENDING'],
+            'accepted': by_status['ACCEPTED'],
+            'picked_up': by_status['PICKED_UP'],
+            'cleaning': by_status['CLEANING'],
+            'ready': by_status['READY'],
+            'delivered': by_status['DELIVERED'],
+            'cancelled': by_status['CANCELLED'],
         }
 
-        # Revenue (simple sum of total_price for delivered orders)
-        pipeline = [
-            {'$match': {'status': 'DELIVERED'}},
-            {'$group': {'_id': None, 'total_revenue': {'$sum': '$total_price'}}}
-        ]
-        revenue_result = list(collection.aggregate(pipeline))
-        total_revenue = revenue_result[0]['total_revenue'] if revenue_result else 0
-
-        # Review & Complaint stats
-        review_count = mongo_service.get_collection('reviews').count_documents({})
-        complaint_count = mongo_service.get_collection('complaints').count_documents({})
-
         return Response({
             'users': user_stats,
             'orders': order_stats,
-            'revenue': total_revenue,
-            'reviews': review_count,
-            'complaints': complaint_count
+            # Revenue only counts delivered orders here
+            'revenue': stats['delivered_revenue'],
+            'reviews': stats['reviews'],
+            'complaints': stats['complaints'],
+            'daily': stats_service.get_daily_counters(days=7),
         })
 
 
@@ -159,11 +150,8 @@ class AdminReviewListView(APIView):
                          for u in User.objects.filter(id__in=user_ids)}
 
         for r in reviews:
-            r['_id'] = str(r['_id'])
             user_id = str(r.get('user_id'))
             r['profile_picture'] = user_profiles.get(user_id)
-            if isinstance(r.get('created_at'), datetime):
-                r['created_at'] = r['created_at'].isoformat()
 
         return Response(reviews)
 
@@ -173,24 +161,26 @@ class AmbassadorAdminListView(APIView):
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        ambassadors = User.objects.filter(role='AMBASSADOR').order_by('-created_at')
+        # One query for ambassadors, their profiles and referral counts
+        ambassadors = list(
+            User.objects.filter(role='AMBASSADOR')
+            .select_related('ambassador_profile')
+            .annotate(referral_count=Count('referrals', filter=Q(referrals__role='CUSTOMER')))
+            .order_by('-created_at')
+        )
         
-        # Get stats for each ambassador
-        order_collection = mongo_service.get_collection('orders')
+        # One aggregation for all ambassadors' commission totals
         commissions_collection = mongo_service.get_collection('commissions')
+        earnings = {
+            row['_id']: row['total_earned']
+            for row in commissions_collection.aggregate([
+                {'$match': {'ambassador_id': {'$in': [str(amb.id) for amb in ambassadors]}}},
+                {'$group': {'_id': '$ambassador_id', 'total_earned': {'$sum': '$commission_amount'}}}
+            ])
+        }
         
         ambassador_data = []
         for amb in ambassadors:
-            # Referral count
-            referral_count = User.objects.filter(referred_by=amb, role='CUSTOMER').count()
-            
-            # Total earnings from commissions collection
-            earnings_result = list(commissions_collection.aggregate([
-                {'$match': {'ambassador_id': str(amb.id)}},
-                {'$group': {'_id': None, 'total_earned': {'$sum': '$commission_amount'}}}
-            ]))
-            total_earned = earnings_result[0]['total_earned'] if earnings_result else 0
-            
             # Referral code
             ref_code = amb.ambassador_profile.referral_code if hasattr(amb, 'ambassador_profile') else None
             
@@ -201,8 +191,8 @@ class AmbassadorAdminListView(APIView):
                 'phone_number': amb.phone_number,
                 'name': f"{amb.first_name} {amb.last_name}".strip() or amb.username,
                 'referral_code': ref_code,
-                'referral_count': referral_count,
-                'total_earnings': float(total_earned),
+                'referral_count': amb.referral_count,
+                'total_earnings': float(earnings.get(str(amb.id), 0)),
                 'date_joined': amb.created_at.isoformat(),
                 'is_active': amb.is_active
             })
@@ -224,15 +214,10 @@ class ComplaintsView(APIView):
                          for u in User.objects.filter(id__in=user_ids)}
 
         for complaint in complaints:
-            complaint['_id'] = str(complaint['_id'])
             user_id = str(complaint.get('user_id'))
             complaint['profile_picture'] = user_profiles.get(user_id)
             if 'message' in complaint and 'description' not in complaint:
                 complaint['description'] = complaint['message']
-            if isinstance(complaint.get('created_at'), datetime):
-                complaint['created_at'] = complaint['created_at'].isoformat()
-            if isinstance(complaint.get('resolved_at'), datetime):
-                complaint['resolved_at'] = complaint['resolved_at'].isoformat()
         
         return Response(complaints)
 
@@ -274,39 +259,3 @@ class ComplaintsView(APIView):
             'complaint_id': str(complaint_id),
             'status': 'RESOLVED'
         })
-    def get(self, request):
-        ambassadors = User.objects.filter(role='AMBASSADOR').order_by('-created_at')
-        
-        # Get stats for each ambassador
-        order_collection = mongo_service.get_collection('orders')
-        commissions_collection = mongo_service.get_collection('commissions')
-        
-        ambassador_data = []
-        for amb in ambassadors:
-            # Referral count
-            referral_count = User.objects.filter(referred_by=amb, role='CUSTOMER').count()
-            
-            # Total earnings from commissions collection
-            earnings_result = list(commissions_collection.aggregate([
-                {'$match': {'ambassador_id': str(amb.id)}},
-                {'$group': {'_id': None, 'total_earned': {'$sum': '$commission_amount'}}}
-            ]))
-            total_earned = earnings_result[0]['total_earned'] if earnings_result else 0
-            
-            # Referral code
-            ref_code = amb.ambassador_profile.referral_code if hasattr(amb, 'ambassador_profile') else None
-            
-            ambassador_data.append({
-                'id': amb.id,
-                'username': amb.username,
-                'email': amb.email,
-                'phone_number': amb.phone_number,
-                'name': f"{amb.first_name} {amb.last_name}".strip() or amb.username,
-                'referral_code': ref_code,
-                'referral_count': referral_count,
-                'total_earnings': float(total_earned),
-                'date_joined': amb.created_at.isoformat(),
-                'is_active': amb.is_active
-            })
-            
-        return Response(ambassador_data)
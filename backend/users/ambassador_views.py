@@ -6,11 +6,11 @@ Ambassadors can:
 - Track referred customers
 - View commission earnings
 """
-from datetime import datetime
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
 from users.permissions import IsAmbassador
 from services.mongo_service import mongo_service
 
@@ -72,22 +72,33 @@ class ReferralHistoryView(APIView):
     """View customers referred by this ambassador."""
     permission_classes = [IsAmbassador]
 
+    page_size = 50
+    max_page_size = 200
+
     def get(self, request):
         user = request.user
-        referrals = User.objects.filter(referred_by=user, role='CUSTOMER').order_by('-created_at')
+        referrals = User.objects.filter(referred_by=user, role='CUSTOMER').order_by('-created_at', '-id')
+
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            page_size = self.page_size
+        paginator = Paginator(referrals, max(page_size, 1))
+        page = paginator.get_page(request.query_params.get('page', 1))
         
-        # Get order stats for each referral from MongoDB
+        # Total spent per referral on this page, in one MongoDB aggregation
         collection = mongo_service.get_collection('orders')
+        spent = {
+            row['_id']: row['total']
+            for row in collection.aggregate([
+                {'$match': {'user_id': {'$in': [str(ref.id) for ref in page]}, 'status': 'DELIVERED'}},
+                {'$group': {'_id': '$user_id', 'total': {'$sum': '$total_price'}}}
+            ])
+        }
         
         referral_data = []
-        for ref in referrals:
-            # Get total spent by this customer
-            pipeline = [
-                {'$match': {'user_id': str(ref.id), 'status': 'DELIVERED'}},
-                {'$group': {'_id': None, 'total': {'$sum': '$total_price'}}}
-            ]
-            res = list(collection.aggregate(pipeline))
-            total_spent = res[0]['total'] if res else 0
+        for ref in page:
+            total_spent = spent.get(str(ref.id), 0)
             
             referral_data.append({
                 'id': ref.id,
@@ -100,7 +111,11 @@ class ReferralHistoryView(APIView):
             })
 
         return Response({
-            'referrals': referral_data
+            'referrals': referral_data,
+            'count': paginator.count,
+            'page': page.number,
+            'num_pages': paginator.num_pages,
+            'next_page': page.next_page_number() if page.has_next() else None
         })
 
 
@@ -115,9 +130,4 @@ class CommissionHistoryView(APIView):
             'ambassador_id': str(request.user.id)
         }).sort('created_at', -1))
 
-        for c in commissions:
-            c['_id'] = str(c['_id'])
-            if isinstance(c.get('created_at'), datetime):
-                c['created_at'] = c['created_at'].isoformat()
-
         return Response(commissions)
@@ -0,0 +1,61 @@
+"""
+Unique Public Codes for Users
+
+User.custom_id (e.g. CS04829175) and AmbassadorProfile.referral_code
+(e.g. 382910) are derived from the row's primary key:
+- The pk is scrambled with an affine permutation of the code space, so codes
+  are unique by construction yet do not reveal signup order or volume
+- The unique constraint on the column is the final arbiter; a clash with a
+  legacy random code is retried a bounded number of times with random codes
+  inside a savepoint, so registration never loops on `exists()` queries
+"""
+import random
+from django.db import IntegrityError, transaction
+
+MAX_CODE_ATTEMPTS = 5
+
+CUSTOM_ID_DIGITS = 8
+REFERRAL_CODE_DIGITS = 6
+
+# Multipliers must be coprime with 10 for the mapping to be a bijection
+_PERMUTATIONS = {
+    CUSTOM_ID_DIGITS: (48271, 20394713),
+    REFERRAL_CODE_DIGITS: (7919, 382907),
+}
+
+
+def scramble(number, digits):
+    """Map `number` onto a zero-padded code of `digits` digits, one-to-one for number < 10**digits."""
+    multiplier, offset = _PERMUTATIONS[digits]
+    modulus = 10 ** digits
+    return f"{(number * multiplier + offset) % modulus:0{digits}d}"
+
+
+def random_code(digits):
+    return ''.join(random.choices('0123456789', k=digits))
+
+
+def code_candidates(pk, digits, prefix=''):
+    """The pk-derived code first, then random fallbacks, MAX_CODE_ATTEMPTS in total."""
+    yield f"{prefix}{scramble(pk, digits)}"
+    for _ in range(MAX_CODE_ATTEMPTS - 1):
+        yield f"{prefix}{random_code(digits)}"
+
+
+def assign_unique_code(instance, field, candidates):
+    """
+    Write the first candidate the unique constraint accepts to `instance.<field>`.
+
+    `instance` must already be saved. Each attempt is one UPDATE in its own
+    savepoint; raises IntegrityError once every candidate has clashed.
+    """
+    model = type(instance)
+    for code in candidates:
+        try:
+            with transaction.atomic():
+                model.objects.filter(pk=instance.pk).update(**{field: code})
+        except IntegrityError:
+            continue
+        setattr(instance, field, code)
+        return code
+    raise IntegrityError(f"Could not allocate a unique {model.__name__}.{field}")
@@ -1,10 +1,10 @@
 import random
-import uuid
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from users.models import User
 from services.mongo_service import mongo_service
+from services.id_generator import order_id_generator
 
 class Command(BaseCommand):
     help = 'Seeds the database with initial users and orders'
@@ -101,7 +101,7 @@ class Command(BaseCommand):
                 created_at = datetime.utcnow() - timedelta(days=random.randint(0, 30))
                 
                 order_data = {
-                    'order_id': f"ORD-{uuid.uuid4().hex[:6].upper()}",
+                    'order_id': order_id_generator.next_order_id(created_at),
                     'user_id': str(customer.id),
                     'customer_name': customer.username,
                     'items': [
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from users.codes import (
+    CUSTOM_ID_DIGITS, REFERRAL_CODE_DIGITS, assign_unique_code, code_candidates
+)
 
 class User(AbstractUser):
     class Role(models.TextChoices):
@@ -36,9 +39,28 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ['email']
 
     def save(self, *args, **kwargs):
-        if not self.custom_id:
-            self.custom_id = self.generate_custom_id()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        if self.custom_id and not adding:
+            super().save(*args, **kwargs)
+            return
+        # The role profile and custom_id (derived from the pk) are written in
+        # the same transaction as the insert
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not self.custom_id:
+                self.generate_custom_id()
+            if adding:
+                self.create_profile()
+
+    def create_profile(self):
+        if self.role == self.Role.CUSTOMER:
+            CustomerProfile.objects.create(user=self)
+        elif self.role == self.Role.RIDER:
+            RiderProfile.objects.create(user=self)
+        elif self.role == self.Role.AMBASSADOR:
+            AmbassadorProfile.objects.create(user=self)
+        elif self.role in [self.Role.ADMIN, self.Role.SUPER_ADMIN]:
+            AdminProfile.objects.create(user=self)
 
     def generate_custom_id(self):
         prefix_map = {
@@ -49,9 +71,7 @@ class User(AbstractUser):
             self.Role.SUPER_ADMIN: 'SD'
         }
         prefix = prefix_map.get(self.role, 'US')
-        import uuid
-        unique_suffix = str(uuid.uuid4().int)[:8]
-        return f"{prefix}{unique_suffix}"
+        return assign_unique_code(self, 'custom_id', code_candidates(self.pk, CUSTOM_ID_DIGITS, prefix))
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -83,17 +103,15 @@ class AmbassadorProfile(models.Model):
     commission_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.05)
     
     def save(self, *args, **kwargs):
-        if not self.referral_code:
-            self.referral_code = self.generate_referral_code()
-        super().save(*args, **kwargs)
+        if self.referral_code:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.generate_referral_code()
 
     def generate_referral_code(self):
-        import random
-        import string
-        while True:
-            code = ''.join(random.choices(string.digits, k=6))
-            if not AmbassadorProfile.objects.filter(referral_code=code).exists():
-                return code
+        return assign_unique_code(self, 'referral_code', code_candidates(self.pk, REFERRAL_CODE_DIGITS))
 
     def __str__(self):
         return f"Ambassador: {self.user.username} ({self.referral_code})"
@@ -107,29 +125,29 @@ class AdminProfile(models.Model):
     def __str__(self):
         return f"Admin: {self.user.username}"
 
-# Signals to create profiles automatically
+# Keep an already-loaded profile in sync when the whole user is saved
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        if instance.role == User.Role.CUSTOMER:
-            CustomerProfile.objects.create(user=instance)
-        elif instance.role == User.Role.RIDER:
-            RiderProfile.objects.create(user=instance)
-        elif instance.role == User.Role.AMBASSADOR:
-            AmbassadorProfile.objects.create(user=instance)
-        elif instance.role in [User.Role.ADMIN, User.Role.SUPER_ADMIN]:
-            AdminProfile.objects.create(user=instance)
+PROFILE_RELATED_NAMES = {
+    User.Role.CUSTOMER: 'customer_profile',
+    User.Role.RIDER: 'rider_profile',
+    User.Role.AMBASSADOR: 'ambassador_profile',
+    User.Role.ADMIN: 'admin_profile',
+    User.Role.SUPER_ADMIN: 'admin_profile',
+}
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if instance.role == User.Role.CUSTOMER and hasattr(instance, 'customer_profile'):
-        instance.customer_profile.save()
-    elif instance.role == User.Role.RIDER and hasattr(instance, 'rider_profile'):
-        instance.rider_profile.save()
-    elif instance.role == User.Role.AMBASSADOR and hasattr(instance, 'ambassador_profile'):
-        instance.ambassador_profile.save()
-    elif instance.role in [User.Role.ADMIN, User.Role.SUPER_ADMIN] and hasattr(instance, 'admin_profile'):
-        instance.admin_profile.save()
+def save_user_profile(sender, instance, created=False, update_fields=None, **kwargs):
+    # New users get their profile in User.save. Targeted writes such as
+    # save(update_fields=['streak_count']) never carry profile data, and a
+    # profile that was never loaded cannot have unsaved changes.
+    if created or update_fields is not None:
+        return
+    related_name = PROFILE_RELATED_NAMES.get(instance.role)
+    if related_name and getattr(User, related_name).is_cached(instance):
+        # The cache also records a missing profile (a failed lookup or a
+        # select_related on a user without one), which raises on access
+        profile = getattr(instance, related_name, None)
+        if profile is not None:
+            profile.save()
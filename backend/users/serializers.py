@@ -2,9 +2,20 @@ import json
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from services.rider_locations import rider_location_store
 
 User = get_user_model()
 
+
+class UserListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        # One hot-store read for every rider on the page
+        rider_ids = [user.id for user in users if user.role == User.Role.RIDER]
+        self.context['rider_locations'] = rider_location_store.get_latest(rider_ids) if rider_ids else {}
+        return super().to_representation(users)
+
+
 class UserSerializer(serializers.ModelSerializer):
     profile_data = serializers.SerializerMethodField()
 
@@ -14,6 +25,28 @@ class UserSerializer(serializers.ModelSerializer):
                  'is_email_verified', 'custom_id', 'streak_count', 'created_at', 'profile_data',
                  'first_name', 'last_name', 'profile_picture')
         read_only_fields = ('id', 'is_email_verified', 'custom_id', 'role', 'created_at')
+        list_serializer_class = UserListSerializer
+
+    def get_latest_location(self, obj):
+        """
+        A rider's latest reported position. Postgres only gets it every
+        LOCATION_PERSIST_INTERVAL seconds, so it is read from the hot store.
+        """
+        locations = self.context.get('rider_locations')
+        if locations is None:
+            locations = rider_location_store.get_latest([obj.id])
+        latest = locations.get(str(obj.id))
+        return latest['location'] if latest else None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.role == User.Role.RIDER:
+            location = self.get_latest_location(instance)
+            if location is not None:
+                data['location'] = location
+                if 'current_location' in data['profile_data']:
+                    data['profile_data']['current_location'] = location
+        return data
 
     def get_profile_data(self, obj):
         if obj.role == User.Role.CUSTOMER and hasattr(obj, 'customer_profile'):
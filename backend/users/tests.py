@@ -1,3 +1,113 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+from services import rider_stats
+from services.mongo_service import mongo_service
+from services.testing import MongoTestCase
+from users.models import CustomerProfile
 
-# Create your tests here.
+User = get_user_model()
+
+
+def make_user(username, role='CUSTOMER', **fields):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, role=role, **fields
+    )
+
+
+class AmbassadorAdminListViewTests(MongoTestCase):
+    url = '/api/users/superadmin/ambassadors/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin', role='ADMIN'))
+
+    def make_ambassadors(self, count):
+        commissions = mongo_service.get_collection('commissions')
+        for i in range(count):
+            ambassador = make_user(f'amb{i}', role='AMBASSADOR')
+            make_user(f'amb{i}-customer1', referred_by=ambassador)
+            make_user(f'amb{i}-customer2', referred_by=ambassador)
+            make_user(f'amb{i}-rider', role='RIDER', referred_by=ambassador)
+            commissions.insert_many([
+                {'ambassador_id': str(ambassador.id), 'order_id': f'O-{i}-1', 'commission_amount': 5.0},
+                {'ambassador_id': str(ambassador.id), 'order_id': f'O-{i}-2', 'commission_amount': 2.5},
+            ])
+
+    def assert_constant_queries(self, count):
+        self.make_ambassadors(count)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), count)
+        for row in response.data:
+            self.assertEqual(row['referral_count'], 2)
+            self.assertEqual(row['total_earnings'], 7.5)
+            self.assertEqual(len(row['referral_code']), 6)
+
+    def test_one_ambassador(self):
+        self.assert_constant_queries(1)
+
+    def test_many_ambassadors(self):
+        self.assert_constant_queries(10)
+
+
+class RiderStatsCacheTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = mongo_service.get_collection('orders')
+        self.orders.insert_one({'order_id': 'O-1', 'assigned_rider_id': '7', 'status': 'ASSIGNED', 'total_price': 50})
+
+    def test_cached_until_invalidated(self):
+        self.assertEqual(rider_stats.get(7)['total_assigned'], 1)
+
+        self.orders.insert_one({'order_id': 'O-2', 'assigned_rider_id': '7', 'status': 'ASSIGNED', 'total_price': 50})
+        self.assertEqual(rider_stats.get(7)['total_assigned'], 1)
+
+        # Any worker's invalidation is visible to every other worker
+        rider_stats.invalidate(7)
+        self.assertEqual(rider_stats.get(7)['total_assigned'], 2)
+
+    def test_compute_racing_an_invalidation_is_not_cached(self):
+        original_compute = rider_stats.compute
+
+        def compute_then_invalidate(rider_id):
+            stats = original_compute(rider_id)
+            # An order moves while this worker is still computing
+            self.orders.insert_one({'order_id': 'O-2', 'assigned_rider_id': '7', 'status': 'ASSIGNED', 'total_price': 50})
+            rider_stats.invalidate(rider_id)
+            return stats
+
+        with mock.patch.object(rider_stats, 'compute', compute_then_invalidate):
+            self.assertEqual(rider_stats.get(7)['total_assigned'], 1)
+
+        self.assertEqual(rider_stats.get(7)['total_assigned'], 2)
+
+
+class SaveUserProfileTests(TestCase):
+    def test_loaded_profile_is_saved_with_user(self):
+        user = make_user('customer')
+        user = User.objects.select_related('customer_profile').get(pk=user.pk)
+        user.customer_profile.loyalty_points = 40
+        user.save()
+
+        self.assertEqual(CustomerProfile.objects.get(user=user).loyalty_points, 40)
+
+    def test_save_survives_cached_missing_profile(self):
+        user = make_user('customer')
+        CustomerProfile.objects.filter(user=user).delete()
+
+        # Both leave "no profile" in the relation cache
+        looked_up = User.objects.get(pk=user.pk)
+        self.assertFalse(hasattr(looked_up, 'customer_profile'))
+        joined = User.objects.select_related('customer_profile').get(pk=user.pk)
+
+        for instance in (looked_up, joined):
+            instance.first_name = 'Ama'
+            instance.save()
+
+        self.assertEqual(User.objects.get(pk=user.pk).first_name, 'Ama')
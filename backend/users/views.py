@@ -9,6 +9,7 @@ from .serializers import UserSerializer, RegisterSerializer
 
 from datetime import datetime
 from services.mongo_service import mongo_service
+from services import stats_service
 
 User = get_user_model()
 
@@ -68,5 +69,6 @@ class ComplaintCreateView(APIView):
         
         collection = mongo_service.get_collection('complaints')
         collection.insert_one(complaint_doc)
+        stats_service.record_complaint_created()
         
         return Response({'message': 'Complaint submitted successfully!'}, status=status.HTTP_201_CREATED)
@@ -88,3 +88,16 @@ export async function apiRequest(endpoint: string, options: ApiRequestOptions =
 
   return response.json();
 }
+
+/** One page of a cursor-paginated list endpoint. */
+export interface Page<T> {
+  results: T[];
+  next: string | null;
+}
+
+/** Append the `cursor` of the page to fetch (if any) to a list endpoint. */
+export function withCursor(endpoint: string, cursor?: string | null) {
+  if (!cursor) return endpoint;
+  const separator = endpoint.includes("?") ? "&" : "?";
+  return `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}`;
+}